@@ -0,0 +1,63 @@
+import numpy as np
+import scipy.stats as stats
+import time
+
+# Esecuzioni minime dopo il riscaldamento e massime in totale per ogni query
+MIN_SAMPLES = 20
+MAX_SAMPLES = 1000
+# Obiettivo: semi-ampiezza dell'intervallo di confidenza al 95% entro TARGET_CI_PERCENT della media
+TARGET_CI_PERCENT = 2.0
+CONFIDENCE = 0.95
+# Tempo massimo (secondi) dedicato a una query, riscaldamento compreso
+TIME_BUDGET = 60
+# Dimensione dei lotti usati da MSER-5 per trovare la fine del riscaldamento
+MSER_BATCH = 5
+
+def mser_truncation(latencies):
+    """
+    Fine del riscaldamento secondo la regola MSER-5: le latenze vengono mediate a lotti di
+    MSER_BATCH e si scarta il numero di lotti iniziali che minimizza l'errore standard della
+    media dei lotti rimanenti, cercando solo nella prima metà della serie. Restituisce il numero
+    di esecuzioni da scartare.
+    """
+    batches = len(latencies) // MSER_BATCH
+    if batches < 4:
+        return 0
+    means = np.asarray(latencies[:batches * MSER_BATCH]).reshape(batches, MSER_BATCH).mean(axis=1)
+    # Somme e somme dei quadrati dei suffissi, per calcolare tutte le varianze in una volta
+    suffix_sum = np.cumsum(means[::-1])[::-1]
+    suffix_squares = np.cumsum((means ** 2)[::-1])[::-1]
+    remaining = np.arange(batches, 0, -1)
+    mser = (suffix_squares - suffix_sum ** 2 / remaining) / remaining ** 2
+    return int(np.argmin(mser[:batches // 2])) * MSER_BATCH
+
+def relative_ci_half_width(latencies):
+    """Semi-ampiezza dell'intervallo t al livello CONFIDENCE, in percentuale della media."""
+    n = len(latencies)
+    return stats.t.ppf((1 + CONFIDENCE) / 2, n - 1) * stats.sem(latencies) / np.mean(latencies) * 100
+
+def run_adaptive(execute, latency_of=None):
+    """
+    Chiama execute() finché, dopo il riscaldamento trovato da mser_truncation, ci sono almeno
+    MIN_SAMPLES esecuzioni e l'intervallo di confidenza è abbastanza stretto, oppure finché non
+    si esauriscono TIME_BUDGET o MAX_SAMPLES. latency_of estrae la latenza in ms dal risultato di
+    execute() (per default è il risultato stesso). Restituisce i risultati di tutte le esecuzioni,
+    il numero di esecuzioni di riscaldamento e il motivo dell'arresto ('ci', 'budget' o 'max').
+    """
+    latency_of = latency_of or (lambda result: result)
+    deadline = time.perf_counter() + TIME_BUDGET
+    results, latencies = [], []
+    while True:
+        result = execute()
+        results.append(result)
+        latencies.append(latency_of(result))
+
+        # La prima esecuzione viene sempre riportata a parte, come nelle misure a ripetizioni fisse
+        warmup = max(mser_truncation(latencies), 1)
+        steady = latencies[warmup:]
+        if len(steady) >= MIN_SAMPLES and relative_ci_half_width(steady) <= TARGET_CI_PERCENT:
+            return results, warmup, 'ci'
+        if time.perf_counter() >= deadline:
+            return results, warmup, 'budget'
+        if len(results) >= MAX_SAMPLES:
+            return results, warmup, 'max'
@@ -0,0 +1,103 @@
+import argparse
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import scipy.stats as stats
+
+import ResultStore
+
+# Soglie predefinite: una cella cambia se il test di Mann-Whitney è significativo al livello ALPHA
+# e la mediana si sposta di almeno MIN_CHANGE_PERCENT
+ALPHA = 0.05
+MIN_CHANGE_PERCENT = 5.0
+
+# Celle confrontate: una per backend, dataset, variante di schema e query; le esecuzioni dei test
+# di carico (backend '<nome>-load' e '<nome>-mixed') hanno anche una cella per livello di carico
+cell_columns = ['backend', 'dataset', 'schema', 'query']
+optional_cell_columns = ['clients', 'write_rate']
+
+def measured_samples(run_id):
+    """Campioni a regime di un'esecuzione, senza prima esecuzione e riscaldamento di ogni query."""
+    return ResultStore.steady_samples(ResultStore.load_run(run_id))
+
+def compare_runs(baseline_id, candidate_id, alpha=ALPHA, min_change_percent=MIN_CHANGE_PERCENT):
+    """
+    Confronta cella per cella le latenze di due esecuzioni con il test di Mann-Whitney (bilaterale,
+    sui campioni grezzi) e restituisce una riga per cella con mediane, variazione percentuale,
+    p-value ed esito: 'slower', 'faster', 'unchanged' o 'missing' se la cella manca in una delle due.
+    """
+    baseline_samples, candidate_samples = measured_samples(baseline_id), measured_samples(candidate_id)
+    columns = cell_columns + [column for column in optional_cell_columns
+                              if column in baseline_samples and column in candidate_samples]
+    baseline = dict(tuple(baseline_samples.groupby(columns)))
+    candidate = dict(tuple(candidate_samples.groupby(columns)))
+    report = []
+    for cell in sorted(set(baseline) | set(candidate)):
+        row = {'baseline': baseline_id, 'candidate': candidate_id, **dict(zip(columns, cell))}
+        if cell not in baseline or cell not in candidate:
+            report.append({**row, 'status': 'missing'})
+            continue
+        before = baseline[cell]['latency_ms'].to_numpy()
+        after = candidate[cell]['latency_ms'].to_numpy()
+        p_value = stats.mannwhitneyu(before, after, alternative='two-sided').pvalue
+        change = (np.median(after) / np.median(before) - 1) * 100
+        if p_value < alpha and change >= min_change_percent:
+            status = 'slower'
+        elif p_value < alpha and change <= -min_change_percent:
+            status = 'faster'
+        else:
+            status = 'unchanged'
+        report.append({
+            **row,
+            'baseline_median_ms': round(np.median(before), 3),
+            'candidate_median_ms': round(np.median(after), 3),
+            'change_percent': round(change, 2),
+            'p_value': p_value,
+            'status': status,
+        })
+    return pd.DataFrame(report)
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare stored benchmark runs and report latency regressions.")
+    parser.add_argument('runs', nargs='*', help="baseline run id followed by one or more candidate run ids "
+                                                "(default: the last two runs of --backend)")
+    parser.add_argument('--backend', default='Cassandra', help="backend used to pick the default runs")
+    parser.add_argument('--alpha', type=float, default=ALPHA, help="significance level of the Mann-Whitney test")
+    parser.add_argument('--min-change', type=float, default=MIN_CHANGE_PERCENT,
+                        help="minimum change of the median, in percent, to report a cell as slower or faster")
+    parser.add_argument('--output', help="CSV file for the report (default: Results/report_<baseline>.csv)")
+    args = parser.parse_args()
+
+    runs = args.runs
+    if not runs:
+        manifest = ResultStore.load_manifest()
+        runs = manifest.loc[manifest['backend'] == args.backend, 'run_id'].tolist()[-2:]
+    if len(runs) < 2:
+        parser.error("at least two runs are needed: a baseline and a candidate")
+
+    manifest = ResultStore.load_manifest().set_index('run_id')
+    for run_id in runs:
+        if run_id in manifest.index:
+            run = manifest.loc[run_id]
+            print(f"{run_id}: {run['backend']}, {run['created_at']}, commit {run['commit']}, {run['samples']} samples")
+
+    baseline_id = runs[0]
+    report = pd.concat([compare_runs(baseline_id, candidate_id, args.alpha, args.min_change) for candidate_id in runs[1:]],
+                       ignore_index=True)
+    with pd.option_context('display.max_rows', None, 'display.width', 200):
+        print(report.drop(columns=['baseline']).to_string(index=False))
+
+    output_file = args.output or os.path.join(ResultStore.RESULTS_DIR, f"report_{baseline_id}.csv")
+    report.to_csv(output_file, index=False)
+    print(f"Report written to {output_file}")
+
+    slower = report[report['status'] == 'slower']
+    if len(slower):
+        print(f"{len(slower)} cells got significantly slower.")
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,196 @@
+from concurrent.futures import ThreadPoolExecutor
+import csv
+import numpy as np
+import threading
+import time
+
+# Numero di client concorrenti provati da sweep_clients
+CLIENT_COUNTS = [1, 4, 16, 64]
+# Durata di ogni livello di carico e secondi iniziali esclusi dalle misure (riscaldamento)
+LOAD_DURATION = 30
+LOAD_WARMUP = 5
+# Percentili di latenza riportati
+PERCENTILES = [50, 95, 99, 99.9]
+# Attesa di un client dopo una richiesta fallita, raddoppiata a ogni errore consecutivo fino a
+# ERROR_BACKOFF_MAX secondi: un backend che rifiuta le richieste non viene interrogato a vuoto
+ERROR_BACKOFF = 0.01
+ERROR_BACKOFF_MAX = 1.0
+
+def run_closed_loop(execute, clients):
+    """
+    Carico a ciclo chiuso: 'clients' thread chiamano execute() uno dopo l'altro, ognuno inviando
+    la richiesta successiva appena riceve la risposta, per LOAD_WARMUP + LOAD_DURATION secondi.
+    Restituisce le latenze (ms) delle richieste riuscite iniziate dopo il riscaldamento, il
+    numero di richieste fallite (escluse dalle latenze e dal throughput) e la durata effettiva
+    della finestra misurata. Dopo un errore il client attende con backoff esponenziale.
+    """
+    start_time = time.perf_counter()
+    measure_from = start_time + LOAD_WARMUP
+    deadline = measure_from + LOAD_DURATION
+
+    def client():
+        latencies, errors, backoff = [], 0, 0
+        while (request_start := time.perf_counter()) < deadline:
+            try:
+                execute()
+            except Exception:
+                errors += request_start >= measure_from
+                backoff = min(backoff * 2 or ERROR_BACKOFF, ERROR_BACKOFF_MAX)
+                time.sleep(min(backoff, max(deadline - time.perf_counter(), 0)))
+                continue
+            backoff = 0
+            if request_start >= measure_from:
+                latencies.append((time.perf_counter() - request_start) * 1000)
+        return latencies, errors
+
+    with ThreadPoolExecutor(max_workers=clients) as pool:
+        results = list(pool.map(lambda _: client(), range(clients)))
+    # Le richieste in volo alla scadenza terminano dopo: la finestra si chiude con l'ultima
+    elapsed = max(time.perf_counter(), deadline) - measure_from
+    latencies = [latency for client_latencies, _ in results for latency in client_latencies]
+    return latencies, sum(errors for _, errors in results), elapsed
+
+def summarize_latencies(latencies, errors, elapsed):
+    """
+    Throughput (richieste riuscite al secondo) e percentili di latenza di un livello di carico:
+    le richieste fallite sono solo contate in Errors.
+    """
+    summary = {
+        'Requests': len(latencies),
+        'Errors': errors,
+        'QPS': f"{len(latencies) / elapsed:.2f}",
+        'Mean (ms)': f"{np.mean(latencies):.2f}" if latencies else 'N/A',
+    }
+    for percentile in PERCENTILES:
+        value = np.percentile(latencies, percentile) if latencies else None
+        summary[f"p{percentile:g} (ms)"] = f"{value:.2f}" if value is not None else 'N/A'
+    return summary
+
+def record_latencies(recorder, labels, latencies, query_suffix='', **metrics):
+    """
+    Aggiunge le latenze di un livello di carico al RunRecorder 'recorder', con dataset, schema e
+    query presi da labels e le metriche del livello (es. clients): sono tutte misurate a regime.
+    """
+    for iteration, latency in enumerate(latencies):
+        recorder.add(labels['Dataset'], labels['Query'] + query_suffix, iteration, latency,
+                     schema=labels.get('Schema', ''), steady=True, **metrics)
+
+def sweep_clients(execute, labels, recorder=None):
+    """
+    Esegue run_closed_loop per ogni numero di client di CLIENT_COUNTS e restituisce una riga per
+    livello, con le etichette 'labels' (es. Backend, Dataset, Query) seguite da Clients e dal riepilogo.
+    Con un RunRecorder le latenze grezze di ogni livello vengono registrate con la metrica 'clients'.
+    """
+    rows = []
+    for clients in CLIENT_COUNTS:
+        latencies, errors, elapsed = run_closed_loop(execute, clients)
+        if recorder is not None:
+            record_latencies(recorder, labels, latencies, clients=clients)
+        row = {**labels, 'Clients': clients, **summarize_latencies(latencies, errors, elapsed)}
+        print(f"{' - '.join(str(value) for value in labels.values())} - {clients} clients: "
+              f"{row['QPS']} QPS, p50 {row['p50 (ms)']} ms, p99 {row['p99 (ms)']} ms, {errors} errors")
+        rows.append(row)
+    return rows
+
+def saturation_point(rows):
+    """Numero di client con il throughput massimo: oltre questo punto aumenta solo la latenza."""
+    best = max(rows, key=lambda row: float(row['QPS']))
+    return best['Clients'], best['QPS']
+
+def write_load_results(path, rows):
+    with open(path, 'w', newline='') as csvfile:
+        writer = csv.DictWriter(csvfile, fieldnames=list(rows[0].keys()))
+        writer.writeheader()
+        writer.writerows(rows)
+
+# Carico misto a ciclo aperto: letture a frequenza fissa mentre un flusso di scritture (nuove
+# visite) procede in parallelo, per ogni frequenza di scrittura di OPEN_LOOP_WRITE_RATES
+OPEN_LOOP_READ_RATE = 20  # letture al secondo
+OPEN_LOOP_WRITE_RATES = [0, 100, 1000]  # visite al secondo
+OPEN_LOOP_WORKERS = 256  # thread che eseguono le richieste programmate
+
+def timed_request(execute, intended_time):
+    """Esegue la richiesta e restituisce (latenza in ms dall'istante previsto, istante di fine); latenza None se fallisce."""
+    try:
+        execute()
+        latency = (time.perf_counter() - intended_time) * 1000
+    except Exception:
+        latency = None
+    return latency, time.perf_counter()
+
+def dispatch_requests(execute, rate, start_time, deadline, pool, requests):
+    """
+    Programma execute() agli istanti start_time + i / rate fino a deadline, indipendentemente
+    dalle risposte. Le latenze partono dall'istante previsto: il tempo passato in coda perché
+    il sistema è in ritardo viene contato invece di spostare gli invii successivi.
+    """
+    if rate <= 0:
+        return
+    request_index = 0
+    while (intended_time := start_time + request_index / rate) < deadline:
+        delay = intended_time - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+        requests.append((intended_time, pool.submit(timed_request, execute, intended_time)))
+        request_index += 1
+
+def collect_requests(requests, measure_from, prefix=''):
+    """
+    Riepilogo (come summarize_latencies, con le chiavi precedute da prefix) delle richieste misurate
+    e latenze delle richieste riuscite.
+    """
+    latencies, errors, last_completion = [], 0, measure_from
+    for intended_time, future in requests:
+        if intended_time < measure_from:
+            continue
+        latency, completed_at = future.result()
+        last_completion = max(last_completion, completed_at)
+        if latency is None:
+            errors += 1
+        else:
+            latencies.append(latency)
+    elapsed = max(last_completion - measure_from, LOAD_DURATION)
+    summary = {f"{prefix}{key}": value for key, value in summarize_latencies(latencies, errors, elapsed).items()}
+    return summary, latencies
+
+def run_open_loop(read, write, read_rate, write_rate):
+    """
+    Esegue read() a read_rate e write() a write_rate richieste al secondo per LOAD_WARMUP + LOAD_DURATION
+    secondi. Restituisce il riepilogo di letture e scritture e le latenze grezze di entrambe.
+    """
+    reads, writes = [], []
+    with ThreadPoolExecutor(max_workers=OPEN_LOOP_WORKERS) as pool:
+        start_time = time.perf_counter()
+        measure_from = start_time + LOAD_WARMUP
+        deadline = measure_from + LOAD_DURATION
+        dispatchers = [
+            threading.Thread(target=dispatch_requests, args=(read, read_rate, start_time, deadline, pool, reads)),
+            threading.Thread(target=dispatch_requests, args=(write, write_rate, start_time, deadline, pool, writes)),
+        ]
+        for dispatcher in dispatchers:
+            dispatcher.start()
+        for dispatcher in dispatchers:
+            dispatcher.join()
+        read_summary, read_latencies = collect_requests(reads, measure_from)
+        write_summary, write_latencies = collect_requests(writes, measure_from, prefix='Write ')
+        return {**read_summary, **write_summary}, read_latencies, write_latencies
+
+def sweep_write_rates(read, write, labels, recorder=None):
+    """
+    Esegue run_open_loop con OPEN_LOOP_READ_RATE letture al secondo per ogni frequenza di
+    OPEN_LOOP_WRITE_RATES e restituisce una riga per frequenza, con le etichette 'labels'.
+    Con un RunRecorder le latenze grezze vengono registrate con la metrica 'write_rate': quelle
+    delle scritture sotto la query seguita da ' (writes)'.
+    """
+    rows = []
+    for write_rate in OPEN_LOOP_WRITE_RATES:
+        summary, read_latencies, write_latencies = run_open_loop(read, write, OPEN_LOOP_READ_RATE, write_rate)
+        if recorder is not None:
+            record_latencies(recorder, labels, read_latencies, write_rate=write_rate)
+            record_latencies(recorder, labels, write_latencies, query_suffix=' (writes)', write_rate=write_rate)
+        row = {**labels, 'Read Rate': OPEN_LOOP_READ_RATE, 'Write Rate': write_rate, **summary}
+        print(f"{' - '.join(str(value) for value in labels.values())} - {write_rate} writes/s: "
+              f"reads p50 {row['p50 (ms)']} ms, p99 {row['p99 (ms)']} ms, "
+              f"writes p99 {row['Write p99 (ms)']} ms, {row['Errors']} + {row['Write Errors']} errors")
+        rows.append(row)
+    return rows
@@ -0,0 +1,135 @@
+from datetime import datetime
+import csv
+import json
+import numpy as np
+import os
+import pandas as pd
+import subprocess
+import time
+
+# Cartella dei risultati: un file .npz per esecuzione del benchmark e un manifest.csv che le elenca.
+# I profili di esecuzione lato server, se raccolti, sono in un file {run_id}.profiles.jsonl accanto
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'Results')
+MANIFEST_FILE = os.path.join(RESULTS_DIR, 'manifest.csv')
+manifest_fields = ['run_id', 'backend', 'created_at', 'commit', 'file', 'samples', 'warmup']
+
+# Precisione dell'istogramma HDR: cifre significative mantenute per ogni valore
+HDR_SIGNIFICANT_DIGITS = 3
+
+def current_commit():
+    """Commit git corrente (abbreviato) a cui associare l'esecuzione, o stringa vuota fuori da un repository."""
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__)), check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ''
+
+class RunRecorder:
+    """
+    Raccoglie i campioni grezzi di un'esecuzione del benchmark. Ogni campione ha run id, backend,
+    dataset, schema, query, iterazione, timestamp (epoch in secondi) e latenza in ms, più
+    eventuali metriche numeriche aggiuntive (es. ttfr_ms, rows, bytes). La metrica 'steady' indica
+    i campioni a regime, usati per le statistiche; record_warmup registra nel manifest quante
+    esecuzioni di riscaldamento sono state scartate per ogni query.
+    """
+    def __init__(self, backend):
+        self.backend = backend
+        self.run_id = f"{backend.lower()}-{datetime.now():%Y%m%dT%H%M%S}"
+        self._samples = []
+        self._warmup = {}
+        self._profiles = []
+
+    def add(self, dataset, query, iteration, latency_ms, schema='', **metrics):
+        self._samples.append({
+            'dataset': dataset, 'schema': schema, 'query': query, 'iteration': iteration,
+            'timestamp': time.time(), 'latency_ms': latency_ms, **metrics,
+        })
+
+    def add_profile(self, dataset, query, iteration, profile, schema=''):
+        """Profilo lato server (traccia Cassandra o PROFILE Neo4j) del campione con le stesse chiavi."""
+        self._profiles.append({'dataset': dataset, 'schema': schema, 'query': query, 'iteration': iteration, 'profile': profile})
+
+    def record_warmup(self, dataset, query, warmup, schema=''):
+        self._warmup['/'.join(part for part in (dataset, schema, query) if part)] = int(warmup)
+
+    def save(self):
+        """Scrive i campioni in colonne di un file .npz compresso e registra l'esecuzione nel manifest."""
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        samples = pd.DataFrame(self._samples)
+        columns = {'run_id': np.full(len(samples), self.run_id), 'backend': np.full(len(samples), self.backend)}
+        for column in samples.columns:
+            values = samples[column].to_numpy()
+            columns[column] = values.astype(str) if values.dtype == object else values
+        file_name = f"{self.run_id}.npz"
+        np.savez_compressed(os.path.join(RESULTS_DIR, file_name), **columns)
+        if self._profiles:
+            with open(os.path.join(RESULTS_DIR, f"{self.run_id}.profiles.jsonl"), 'w') as profiles_file:
+                for profile in self._profiles:
+                    profiles_file.write(json.dumps({'run_id': self.run_id, **profile}, default=str) + '\n')
+
+        write_header = not os.path.exists(MANIFEST_FILE)
+        with open(MANIFEST_FILE, 'a', newline='') as csvfile:
+            writer = csv.DictWriter(csvfile, fieldnames=manifest_fields)
+            if write_header:
+                writer.writeheader()
+            writer.writerow({
+                'run_id': self.run_id, 'backend': self.backend, 'created_at': datetime.now().isoformat(timespec='seconds'),
+                'commit': current_commit(), 'file': file_name, 'samples': len(samples),
+                'warmup': json.dumps(self._warmup) if self._warmup else '',
+            })
+        return self.run_id
+
+def load_manifest():
+    if not os.path.exists(MANIFEST_FILE):
+        return pd.DataFrame(columns=manifest_fields)
+    return pd.read_csv(MANIFEST_FILE, dtype={'commit': str}, keep_default_na=False)
+
+def load_run(run_id):
+    """Campioni di un'esecuzione come DataFrame, una riga per campione."""
+    with np.load(os.path.join(RESULTS_DIR, f"{run_id}.npz")) as columns:
+        return pd.DataFrame({column: columns[column] for column in columns.files})
+
+def load_profiles(run_id):
+    """Profili lato server di un'esecuzione, uno per campione profilato (lista vuota se non raccolti)."""
+    profiles_path = os.path.join(RESULTS_DIR, f"{run_id}.profiles.jsonl")
+    if not os.path.exists(profiles_path):
+        return []
+    with open(profiles_path) as profiles_file:
+        return [json.loads(line) for line in profiles_file]
+
+def steady_samples(samples):
+    """Campioni a regime: quelli marcati 'steady' o, per le esecuzioni senza la colonna, tutti tranne la prima."""
+    if 'steady' in samples:
+        return samples[samples['steady'].astype(bool)]
+    return samples[samples['iteration'] > 0]
+
+def latest_run_id(backend):
+    """Id dell'ultima esecuzione registrata per il backend, o None se non ce ne sono."""
+    runs = load_manifest()
+    runs = runs[runs['backend'] == backend]
+    return runs['run_id'].iloc[-1] if len(runs) else None
+
+def hdr_histogram(latencies_ms, significant_digits=HDR_SIGNIFICANT_DIGITS):
+    """
+    Istogramma HDR delle latenze, in microsecondi: ogni valore viene ridotto al limite superiore
+    del suo bucket, di ampiezza proporzionale al valore (precisione relativa costante di
+    'significant_digits' cifre, come HdrHistogram). Restituisce (valori dei bucket, conteggi).
+    """
+    values = np.maximum(np.rint(np.asarray(latencies_ms, dtype=float) * 1000), 1).astype(np.int64)
+    # Bucket per ogni potenza di 2 divisi in sub_bucket_half sotto-intervalli lineari
+    sub_bucket_half_magnitude = int(np.ceil(np.log2(2 * 10 ** significant_digits))) - 1
+    shifts = np.maximum(np.floor(np.log2(values)).astype(np.int64) - sub_bucket_half_magnitude, 0)
+    highest_equivalent = ((values >> shifts) << shifts) + (np.int64(1) << shifts) - 1
+    return np.unique(highest_equivalent, return_counts=True)
+
+def hdr_percentiles(latencies_ms, percentiles, significant_digits=HDR_SIGNIFICANT_DIGITS):
+    """Percentili (in ms) calcolati sull'istogramma HDR: il bucket in cui cade il campione di rango ceil(p * n)."""
+    if len(latencies_ms) == 0:
+        return {percentile: np.nan for percentile in percentiles}
+    bucket_values, counts = hdr_histogram(latencies_ms, significant_digits)
+    cumulative = np.cumsum(counts)
+    results = {}
+    for percentile in percentiles:
+        rank = max(int(np.ceil(percentile / 100 * cumulative[-1])), 1)
+        results[percentile] = bucket_values[np.searchsorted(cumulative, rank)] / 1000
+    return results
@@ -1,15 +1,62 @@
+import numpy as np
 import pandas as pd
 from cassandra.cluster import Cluster
-from uuid import uuid4
+from cassandra.concurrent import execute_concurrent
+from cassandra.murmur3 import murmur3
+from contextlib import nullcontext
+from decimal import Decimal
+from itertools import islice
+from multiprocessing import Pool, Queue
+from queue import Empty
+from uuid import NAMESPACE_DNS, UUID, uuid5
 from tqdm import tqdm
+import hashlib
 import os
+import pickle
+import shutil
+import struct
+import tempfile
 
-def generate_uuid_map(dataframe, column_name):
+CONTACT_POINTS = ['127.0.0.1']
+
+# Richieste concorrenti in volo durante il caricamento e righe inviate per blocco
+CONCURRENCY = 128
+BATCH_ROWS = 10000
+
+# Caricamento parallelo: con LOAD_WORKERS > 1 le righe di ogni keyspace vengono divise per
+# intervallo di token Murmur3 della chiave di partizione tra LOAD_WORKERS processi, ognuno con
+# una propria sessione aperta all'avvio e riusata per tutti i suoi intervalli. Le righe di ogni
+# keyspace sono preparate e divise una sola volta, poi ogni processo legge solo quelle del proprio
+# intervallo. Con PARALLEL_KEYSPACES i quattro keyspace vengono caricati insieme
+LOAD_WORKERS = os.cpu_count()
+PARALLEL_KEYSPACES = True
+
+# Le chiavi sono UUID v5 derivati dall'id intero di origine: ricaricare la stessa riga
+# sovrascrive la stessa chiave, quindi gli INSERT sono idempotenti e un caricamento
+# interrotto può riprendere dall'ultimo blocco registrato in load_checkpoints
+KEY_NAMESPACE = uuid5(NAMESPACE_DNS, 'healthcare.database-b')
+
+# Indice SAI (Storage-Attached Index, Cassandra 5.0+) su patients.birthdate, per la variante
+# 'sai' della Query 4 in Query[Cassandra]
+PATIENT_BIRTHDATE_SAI = False
+
+# Tabelle con i dati caricati (svuotate se un keyspace contiene un caricamento diverso)
+data_tables = [
+    'patients', 'patients_by_birth_year', 'doctors', 'procedures', 'visits',
+    'patient_visit_counts', 'doctor_visits', 'procedure_visit_stats', 'doctor_patient_counts',
+    'doctor_patient_counts_by_month', 'procedure_visit_stats_by_month', 'doctor_visits_by_month',
+]
+
+def entity_uuid(entity, value):
+    """UUID deterministico per l'id 'value' dell'entità 'entity' (es. 'patient', 42)."""
+    return uuid5(KEY_NAMESPACE, f"{entity}:{int(value)}")
+
+def generate_uuid_map(dataframe, column_name, entity):
     """Genera una mappa UUID per i valori unici in una colonna."""
     uuid_map = {}
     unique_values = dataframe[column_name].unique()
     for value in unique_values:
-        uuid_map[value] = uuid4()
+        uuid_map[value] = entity_uuid(entity, value)
     return uuid_map
 
 def create_keyspace_and_tables(session, keyspace_name):
@@ -21,18 +68,44 @@ def create_keyspace_and_tables(session, keyspace_name):
     """)
     session.set_keyspace(keyspace_name)
 
+    # Le versioni precedenti salvavano birthdate come TEXT: la tabella va ricreata come DATE.
+    # Vengono ricreate anche tutte le altre tabelle dei dati, i checkpoint e il manifest: il
+    # caricamento successivo riparte da zero, senza sommare i contatori a quelli già presenti
+    birthdate_column = session.execute("""
+        SELECT type FROM system_schema.columns
+        WHERE keyspace_name = %s AND table_name = 'patients' AND column_name = 'birthdate'
+    """, (keyspace_name,)).one()
+    if birthdate_column and birthdate_column.type == 'text':
+        print(f"Table 'patients' in '{keyspace_name}' stores birthdate as TEXT: recreating all tables.")
+        for table_name in data_tables + ['load_checkpoints', 'load_manifest']:
+            session.execute(f"DROP TABLE IF EXISTS {table_name}")
+
     # Definizione delle tabelle
     tables = {
         'patients': """
             CREATE TABLE IF NOT EXISTS patients (
                 id UUID PRIMARY KEY,
                 name TEXT,
-                birthdate TEXT,
+                birthdate DATE,
                 address TEXT,
                 phone_number TEXT,
                 email TEXT
             )
         """,
+        # Pazienti partizionati per anno di nascita: una query per intervallo di date legge
+        # solo le partizioni degli anni coinvolti, ordinate per birthdate
+        'patients_by_birth_year': """
+            CREATE TABLE IF NOT EXISTS patients_by_birth_year (
+                birth_year INT,
+                birthdate DATE,
+                id UUID,
+                name TEXT,
+                address TEXT,
+                phone_number TEXT,
+                email TEXT,
+                PRIMARY KEY ((birth_year), birthdate, id)
+            )
+        """,
         'doctors': """
             CREATE TABLE IF NOT EXISTS doctors (
                 id UUID PRIMARY KEY,
@@ -94,6 +167,54 @@ def create_keyspace_and_tables(session, keyspace_name):
                 total_patients COUNTER,
                 PRIMARY KEY ((doctor_id), visit_date)
             )
+        """,
+        # Schema per bucket temporali: le stesse aggregazioni giornaliere partizionate per mese
+        # (visit_month = anno * 100 + mese), così una query su un intervallo di date legge solo
+        # le partizioni dei mesi coinvolti invece di scandire tutta la tabella con ALLOW FILTERING
+        'doctor_patient_counts_by_month': """
+            CREATE TABLE IF NOT EXISTS doctor_patient_counts_by_month (
+                visit_month INT,
+                visit_date DATE,
+                doctor_id UUID,
+                total_patients COUNTER,
+                PRIMARY KEY ((visit_month), visit_date, doctor_id)
+            )
+        """,
+        'procedure_visit_stats_by_month': """
+            CREATE TABLE IF NOT EXISTS procedure_visit_stats_by_month (
+                visit_month INT,
+                visit_date DATE,
+                procedure_id UUID,
+                doctor_specialization TEXT,
+                procedure_count COUNTER,
+                PRIMARY KEY ((visit_month), visit_date, procedure_id, doctor_specialization)
+            )
+        """,
+        'doctor_visits_by_month': """
+            CREATE TABLE IF NOT EXISTS doctor_visits_by_month (
+                visit_month INT,
+                visit_date DATE,
+                doctor_id UUID,
+                specialization TEXT,
+                visit_count COUNTER,
+                PRIMARY KEY ((visit_month), visit_date, doctor_id, specialization)
+            )
+        """,
+        'load_checkpoints': """
+            CREATE TABLE IF NOT EXISTS load_checkpoints (
+                table_name TEXT,
+                range_index INT,
+                batches_done INT,
+                load_signature TEXT,
+                PRIMARY KEY ((table_name), range_index)
+            )
+        """,
+        'load_manifest': """
+            CREATE TABLE IF NOT EXISTS load_manifest (
+                keyspace_name TEXT PRIMARY KEY,
+                dataset_hash TEXT,
+                completed_at TIMESTAMP
+            )
         """
     }
 
@@ -102,102 +223,482 @@ def create_keyspace_and_tables(session, keyspace_name):
         session.execute(create_table_query)
         print(f"Table '{table_name}' created or already exists.")
 
-def insert_data(session, keyspace_name, patients, doctors, procedures, visits):
+    if PATIENT_BIRTHDATE_SAI:
+        session.execute("""
+            CREATE CUSTOM INDEX IF NOT EXISTS patients_birthdate_sai
+            ON patients (birthdate) USING 'StorageAttachedIndex'
+        """)
+        print("Index 'patients_birthdate_sai' created or already exists.")
+
+def batched(iterable, size):
+    """Suddivide un iterabile in liste di al più 'size' elementi."""
+    iterator = iter(iterable)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+def as_datetimes(values):
+    """Colonna di date come datetime64: quelle del formato 'npy' lo sono già, quelle dei CSV vengono lette dal testo."""
+    return values if pd.api.types.is_datetime64_any_dtype(values) else pd.to_datetime(values)
+
+def visit_costs(visits):
+    """
+    Costi delle visite come Decimal: dai centesimi interi del formato 'npy' senza passare per
+    float, altrimenti dal testo del valore letto dal CSV.
+    """
+    if 'cost_cents' in visits:
+        return [Decimal(cents).scaleb(-2) for cents in visits['cost_cents'].tolist()]
+    return [Decimal(str(cost)) for cost in visits['cost']]
+
+def aggregate_counters(visits):
+    """
+    Raggruppa le visite (già unite alla specializzazione del medico) per la chiave primaria
+    completa di ogni tabella contatore e conta le visite per chiave. Le colonne chiave sono
+    nell'ordine dei parametri della clausola WHERE del rispettivo UPDATE.
+    """
+    dates = as_datetimes(visits['date'])
+    visits = visits.assign(month=dates.dt.year * 100 + dates.dt.month)
+    return {
+        'patient_visit_counts': visits.groupby(['patient_id', 'date']).size(),
+        'doctor_visits': visits.groupby(['doctor_id', 'specialization', 'date']).size(),
+        'procedure_visit_stats': visits.groupby(['procedure_id', 'specialization', 'date']).size(),
+        'doctor_patient_counts': visits.groupby(['doctor_id', 'date']).size(),
+        'doctor_patient_counts_by_month': visits.groupby(['month', 'date', 'doctor_id']).size(),
+        'procedure_visit_stats_by_month': visits.groupby(['month', 'date', 'procedure_id', 'specialization']).size(),
+        'doctor_visits_by_month': visits.groupby(['month', 'date', 'doctor_id', 'specialization']).size(),
+    }
+
+def counter_rows(counts, id_maps):
+    """Parametri (N, chiave...) per gli UPDATE dei contatori, con id convertiti in UUID e date in DATE."""
+    table = counts.reset_index(name='count')
+    for column, id_map in id_maps.items():
+        if column in table:
+            table[column] = table[column].map(id_map)
+    table['date'] = as_datetimes(table['date']).dt.date
+    if 'month' in table:
+        table['month'] = table['month'].astype(int)
+    return table[['count'] + list(counts.index.names)].itertuples(index=False, name=None)
+
+# Statement di caricamento, preparati da ogni sessione che li usa. L'ordine dei parametri
+# è quello delle tuple prodotte da build_load_rows
+load_statements = {
+    'patients': """
+        INSERT INTO patients (id, name, birthdate, address, phone_number, email) 
+        VALUES (?, ?, ?, ?, ?, ?)
+    """,
+    'patients_by_birth_year': """
+        INSERT INTO patients_by_birth_year (birth_year, birthdate, id, name, address, phone_number, email)
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+    """,
+    'doctors': """
+        INSERT INTO doctors (id, name, specialization, address, phone_number, email) 
+        VALUES (?, ?, ?, ?, ?, ?)
+    """,
+    'procedures': """
+        INSERT INTO procedures (id, description, code) 
+        VALUES (?, ?, ?)
+    """,
+    'visits': """
+        INSERT INTO visits (id, date, cost, patient_id, doctor_id, procedure_id, duration) 
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+    """,
+    'patient_visit_counts': """
+        UPDATE patient_visit_counts 
+        SET visit_count = visit_count + ? 
+        WHERE patient_id = ? 
+        AND visit_date = ?
+    """,
+    'doctor_visits': """
+        UPDATE doctor_visits 
+        SET visit_count = visit_count + ?
+        WHERE doctor_id = ? 
+        AND specialization = ?
+        AND visit_date = ?
+    """,
+    'procedure_visit_stats': """
+        UPDATE procedure_visit_stats 
+        SET procedure_count = procedure_count + ?
+        WHERE procedure_id = ? 
+        AND doctor_specialization = ?
+        AND visit_date = ?
+    """,
+    'doctor_patient_counts': """
+        UPDATE doctor_patient_counts 
+        SET total_patients = total_patients + ?
+        WHERE doctor_id = ? 
+        AND visit_date = ?
+    """,
+    'doctor_patient_counts_by_month': """
+        UPDATE doctor_patient_counts_by_month
+        SET total_patients = total_patients + ?
+        WHERE visit_month = ?
+        AND visit_date = ?
+        AND doctor_id = ?
+    """,
+    'procedure_visit_stats_by_month': """
+        UPDATE procedure_visit_stats_by_month
+        SET procedure_count = procedure_count + ?
+        WHERE visit_month = ?
+        AND visit_date = ?
+        AND procedure_id = ?
+        AND doctor_specialization = ?
+    """,
+    'doctor_visits_by_month': """
+        UPDATE doctor_visits_by_month
+        SET visit_count = visit_count + ?
+        WHERE visit_month = ?
+        AND visit_date = ?
+        AND doctor_id = ?
+        AND specialization = ?
+    """,
+}
+
+# Posizione, nelle tuple di parametri, delle colonne della chiave di partizione di ogni tabella
+partition_key_positions = {
+    'patients': (0,),
+    'patients_by_birth_year': (0,),
+    'doctors': (0,),
+    'procedures': (0,),
+    'visits': (0,),
+    'patient_visit_counts': (1,),
+    'doctor_visits': (1, 2),
+    'procedure_visit_stats': (1, 2),
+    'doctor_patient_counts': (1,),
+    'doctor_patient_counts_by_month': (1,),
+    'procedure_visit_stats_by_month': (1,),
+    'doctor_visits_by_month': (1,),
+}
+
+# Lettura del valore corrente dei contatori, usata per riallineare il primo blocco dopo una ripresa
+counter_select_statements = {
+    'patient_visit_counts': "SELECT visit_count FROM patient_visit_counts WHERE patient_id = ? AND visit_date = ?",
+    'doctor_visits': "SELECT visit_count FROM doctor_visits WHERE doctor_id = ? AND specialization = ? AND visit_date = ?",
+    'procedure_visit_stats': "SELECT procedure_count FROM procedure_visit_stats WHERE procedure_id = ? AND doctor_specialization = ? AND visit_date = ?",
+    'doctor_patient_counts': "SELECT total_patients FROM doctor_patient_counts WHERE doctor_id = ? AND visit_date = ?",
+    'doctor_patient_counts_by_month': "SELECT total_patients FROM doctor_patient_counts_by_month WHERE visit_month = ? AND visit_date = ? AND doctor_id = ?",
+    'procedure_visit_stats_by_month': "SELECT procedure_count FROM procedure_visit_stats_by_month WHERE visit_month = ? AND visit_date = ? AND procedure_id = ? AND doctor_specialization = ?",
+    'doctor_visits_by_month': "SELECT visit_count FROM doctor_visits_by_month WHERE visit_month = ? AND visit_date = ? AND doctor_id = ? AND specialization = ?",
+}
+
+def build_load_rows(patients, doctors, procedures, visits):
+    """
+    Prepara i parametri di caricamento di ogni tabella: restituisce, nell'ordine di
+    load_statements, coppie (iterabile di tuple di parametri, numero di righe).
+    """
+    # Genera UUID per i dati esistenti
+    patient_id_map = generate_uuid_map(patients, 'id', 'patient')
+    doctor_id_map = generate_uuid_map(doctors, 'id', 'doctor')
+    procedure_id_map = generate_uuid_map(procedures, 'id', 'procedure')
+
+    load_rows = {}
+    birthdates = as_datetimes(patients['birthdate'])
+    patients = patients.assign(
+        id=patients['id'].map(patient_id_map),
+        birthdate=birthdates.dt.date,  # Convertire 'birthdate' in formato DATE
+        birth_year=birthdates.dt.year,
+    )
+    patient_rows = patients[['id', 'name', 'birthdate', 'address', 'phone_number', 'email']].itertuples(index=False, name=None)
+    load_rows['patients'] = (patient_rows, len(patients))
+    patient_year_rows = patients[['birth_year', 'birthdate', 'id', 'name', 'address', 'phone_number', 'email']].itertuples(index=False, name=None)
+    load_rows['patients_by_birth_year'] = (patient_year_rows, len(patients))
+    doctor_rows = doctors[['id', 'name', 'specialization', 'address', 'phone_number', 'email']].itertuples(index=False, name=None)
+    load_rows['doctors'] = (((doctor_id_map[row[0]],) + row[1:] for row in doctor_rows), len(doctors))
+    procedure_rows = procedures[['id', 'description', 'code']].itertuples(index=False, name=None)
+    load_rows['procedures'] = (((procedure_id_map[row[0]],) + row[1:] for row in procedure_rows), len(procedures))
+
+    # Collegare ogni visita alla specializzazione del medico con un'unica join vettoriale,
+    # scartando le visite che fanno riferimento a righe assenti dal sottoinsieme
+    valid = (
+        visits['patient_id'].isin(patient_id_map.keys())
+        & visits['doctor_id'].isin(doctor_id_map.keys())
+        & visits['procedure_id'].isin(procedure_id_map.keys())
+    )
+    if not valid.all():
+        print(f"{(~valid).sum()} visit records skipped due to missing references.")
+    visits = visits[valid].merge(
+        doctors[['id', 'specialization']].rename(columns={'id': 'doctor_id'}), on='doctor_id', how='left'
+    )
+
+    visit_rows = pd.DataFrame({
+        'date': as_datetimes(visits['date']).dt.date,  # Convertire 'date' in formato DATE
+        'cost': visit_costs(visits),
+        'patient_id': visits['patient_id'].map(patient_id_map),
+        'doctor_id': visits['doctor_id'].map(doctor_id_map),
+        'procedure_id': visits['procedure_id'].map(procedure_id_map),
+        'duration': visits['duration'],
+    }).itertuples(index=False, name=None)
+    visit_ids = [entity_uuid('visit', visit_id) for visit_id in visits['id']]
+    load_rows['visits'] = (((visit_id,) + row for visit_id, row in zip(visit_ids, visit_rows)), len(visits))
+
+    # Contatori: un solo 'contatore + N' per chiave primaria distinta
+    id_maps = {'patient_id': patient_id_map, 'doctor_id': doctor_id_map, 'procedure_id': procedure_id_map}
+    for table_name, counts in aggregate_counters(visits).items():
+        load_rows[table_name] = (counter_rows(counts, id_maps), len(counts))
+    return load_rows
+
+def reconcile_counter_batch(session, table_name, batch):
+    """
+    Dopo una ripresa il primo blocco di un contatore può essere stato applicato in parte.
+    Ogni chiave compare una sola volta (i contatori sono pre-aggregati), quindi il valore
+    atteso è N: si legge il valore corrente e si invia solo la differenza.
+    """
+    select = session.prepare(counter_select_statements[table_name])
+    results = execute_concurrent(session, [(select, row[1:]) for row in batch],
+                                 concurrency=CONCURRENCY, raise_on_first_error=True)
+    reconciled = []
+    for row, (_, result) in zip(batch, results):
+        current = result.one()
+        delta = row[0] - (current[0] if current else 0)
+        if delta:
+            reconciled.append((delta,) + row[1:])
+    return reconciled
+
+def load_table(session, table_name, rows, total, desc, range_index=0, load_signature=None, progress=None):
+    """
+    Carica le righe di una tabella a blocchi di BATCH_ROWS. Con load_signature, dopo ogni
+    blocco completato viene registrato in load_checkpoints il numero di blocchi eseguiti,
+    e una ripresa salta i blocchi già registrati. Per le tabelle contatore il primo blocco
+    eseguito viene sempre riallineato con reconcile_counter_batch, così un blocco interrotto
+    a metà non viene contato due volte. Senza 'progress' (un oggetto con update(righe)) la
+    tabella ha una propria barra di avanzamento.
+    """
+    statement = session.prepare(load_statements[table_name])
+    batches_done = 0
+    if load_signature is not None:
+        save_checkpoint = session.prepare("""
+            INSERT INTO load_checkpoints (table_name, range_index, batches_done, load_signature)
+            VALUES (?, ?, ?, ?)
+        """)
+        checkpoint = session.execute(
+            "SELECT batches_done FROM load_checkpoints WHERE table_name = %s AND range_index = %s",
+            (table_name, range_index)).one()
+        batches_done = checkpoint.batches_done if checkpoint else 0
+
+    first_batch = True
+    with tqdm(total=total, desc=desc, unit='rows') if progress is None else nullcontext(progress) as progress:
+        progress.update(min(batches_done * BATCH_ROWS, total))
+        for batch_index, batch in enumerate(batched(rows, BATCH_ROWS)):
+            if batch_index < batches_done:
+                continue
+            batch_rows = len(batch)
+            if first_batch and table_name in counter_select_statements:
+                batch = reconcile_counter_batch(session, table_name, batch)
+            first_batch = False
+            execute_concurrent(session, [(statement, row) for row in batch], concurrency=CONCURRENCY, raise_on_first_error=True)
+            if load_signature is not None:
+                session.execute(save_checkpoint, (table_name, range_index, batch_index + 1, load_signature))
+            progress.update(batch_rows)
+
+def insert_data(session, keyspace_name, patients, doctors, procedures, visits, load_signature=None):
     """Inserisce i dati nelle tabelle e aggiorna i contatori."""
     session.set_keyspace(keyspace_name)
     
     try:
-        # Genera UUID per i dati esistenti
-        patient_id_map = generate_uuid_map(patients, 'id')
-        doctor_id_map = generate_uuid_map(doctors, 'id')
-        procedure_id_map = generate_uuid_map(procedures, 'id')
-        
-        # Inserire i dati nella tabella dei pazienti
-        for _, row in tqdm(patients.iterrows(), total=len(patients), desc="Inserimento pazienti"):
-            session.execute("""
-                INSERT INTO patients (id, name, birthdate, address, phone_number, email) 
-                VALUES (%s, %s, %s, %s, %s, %s)
-            """, (patient_id_map[row['id']], row['name'], row['birthdate'], row['address'], row['phone_number'], row['email']))
-        print("Patients data inserted.")
-        
-        # Inserire i dati nella tabella dei dottori
-        for _, row in tqdm(doctors.iterrows(), total=len(doctors), desc="Inserimento dottori"):
-            session.execute("""
-                INSERT INTO doctors (id, name, specialization, address, phone_number, email) 
-                VALUES (%s, %s, %s, %s, %s, %s)
-            """, (doctor_id_map[row['id']], row['name'], row['specialization'], row['address'], row['phone_number'], row['email']))
-        print("Doctors data inserted.")
-        
-        # Inserire i dati nella tabella delle procedure
-        for _, row in tqdm(procedures.iterrows(), total=len(procedures), desc="Inserimento procedure"):
-            session.execute("""
-                INSERT INTO procedures (id, description, code) 
-                VALUES (%s, %s, %s)
-            """, (procedure_id_map[row['id']], row['description'], row['code']))
-        print("Procedures data inserted.")
-        
-        # Inserire i dati nella tabella delle visite e aggiornare i contatori
-        for _, row in tqdm(visits.iterrows(), total=len(visits), desc="Inserimento visite"):
-            patient_id = patient_id_map.get(row['patient_id'])
-            doctor_id = doctor_id_map.get(row['doctor_id'])
-            procedure_id = procedure_id_map.get(row['procedure_id'])
-            
-            if patient_id and doctor_id and procedure_id:
-                # Inserimento nella tabella 'visits'
-                session.execute("""
-                    INSERT INTO visits (id, date, cost, patient_id, doctor_id, procedure_id, duration) 
-                    VALUES (%s, %s, %s, %s, %s, %s, %s)
-                """, (uuid4(), row['date'], row['cost'], patient_id, doctor_id, procedure_id, row['duration']))
-                
-                # Aggiornamento dei contatori
-                visit_date = pd.to_datetime(row['date']).date()  # Convertire 'row['date']' in formato DATE
-                doctor_specialization = doctors.loc[doctors['id'] == row['doctor_id'], 'specialization'].values[0]
-                
-                # Aggiornamento di patient_visit_counts
-                session.execute("""
-                    UPDATE patient_visit_counts 
-                    SET visit_count = visit_count + 1 
-                    WHERE patient_id = %s 
-                    AND visit_date = %s
-                """, (patient_id, visit_date))
-                
-                # Aggiornamento di doctor_visits
-                session.execute("""
-                    UPDATE doctor_visits 
-                    SET visit_count = visit_count + 1
-                    WHERE doctor_id = %s 
-                    AND specialization = %s
-                    AND visit_date = %s
-                """, (doctor_id, doctor_specialization, visit_date))
-                
-                # Aggiornamento di procedure_visit_stats
-                session.execute("""
-                    UPDATE procedure_visit_stats 
-                    SET procedure_count = procedure_count + 1
-                    WHERE procedure_id = %s 
-                    AND doctor_specialization = %s
-                    AND visit_date = %s
-                """, (procedure_id, doctor_specialization, visit_date))
-                
-                # Aggiornamento di doctor_patient_counts
-                session.execute("""
-                    UPDATE doctor_patient_counts 
-                    SET total_patients = total_patients + 1
-                    WHERE doctor_id = %s 
-                    AND visit_date = %s
-                """, (doctor_id, visit_date))
-            else:
-                print(f"Visit record skipped due to missing references: {row}")
-        print("Visits data inserted and counters updated.")
+        for table_name, (rows, total) in build_load_rows(patients, doctors, procedures, visits).items():
+            load_table(session, table_name, rows, total, f"Caricamento {table_name}", load_signature=load_signature)
+            print(f"Table '{table_name}' loaded.")
+        print("Data inserted and counters updated.")
+        return True
         
     except Exception as e:
         print(f"Error during data insertion: {e}")
+        return False
+
+# --- Caricamento parallelo per intervalli di token ---
+
+def serialize_key_component(value):
+    if isinstance(value, UUID):
+        return value.bytes
+    if isinstance(value, (int, np.integer)):
+        return struct.pack('>i', int(value))  # INT (visit_month)
+    return str(value).encode('utf-8')
+
+def partition_token(row, key_positions):
+    """
+    Token Murmur3 della chiave di partizione, calcolato come fa Cassandra: i valori serializzati
+    per le chiavi semplici, la codifica composita (lunghezza, byte, 0x00) per quelle composte.
+    """
+    components = [serialize_key_component(row[position]) for position in key_positions]
+    if len(components) == 1:
+        return murmur3(components[0])
+    return murmur3(b''.join(struct.pack('>H', len(component)) + component + b'\x00' for component in components))
+
+def split_by_token_range(load_rows, workers):
+    """
+    Divide l'anello dei token in 'workers' intervalli di uguale ampiezza e assegna ogni riga
+    all'intervallo che contiene il token della sua chiave di partizione. Restituisce, per ogni
+    intervallo, le righe di ogni tabella.
+    """
+    slices = [{table_name: [] for table_name in load_rows} for _ in range(workers)]
+    for table_name, (rows, _) in load_rows.items():
+        key_positions = partition_key_positions[table_name]
+        for row in rows:
+            range_index = min((partition_token(row, key_positions) + 2 ** 63) * workers >> 64, workers - 1)
+            slices[range_index][table_name].append(row)
+    return slices
+
+def token_slice_path(slice_dir, keyspace_name, range_index):
+    return os.path.join(slice_dir, f"{keyspace_name}_{range_index}.pkl")
+
+def write_token_slices(task):
+    """
+    Prepara una sola volta le righe di un keyspace: legge il sottoinsieme, costruisce le righe,
+    le divide per intervallo di token e scrive in slice_dir un file per intervallo, letto poi
+    dal solo processo che lo carica. Restituisce il numero di righe di ogni intervallo.
+    """
+    keyspace_name, base_path, percentage, slice_dir = task
+    try:
+        slices = split_by_token_range(build_load_rows(*load_subdataset(base_path, percentage)), LOAD_WORKERS)
+        for range_index, rows_by_table in enumerate(slices):
+            with open(token_slice_path(slice_dir, keyspace_name, range_index), 'wb') as slice_file:
+                pickle.dump(rows_by_table, slice_file, protocol=pickle.HIGHEST_PROTOCOL)
+        return keyspace_name, [sum(len(rows) for rows in rows_by_table.values()) for rows_by_table in slices]
+    except Exception as e:
+        print(f"Error while preparing the rows of keyspace '{keyspace_name}': {e}")
+        return keyspace_name, None
+
+class LoadProgress:
+    """Avanzamento di un processo di caricamento, inviato alla barra unica del processo principale."""
+
+    def __init__(self, queue):
+        self.queue = queue
+
+    def update(self, rows):
+        if rows:
+            self.queue.put(rows)
+
+# Sessione e avanzamento del processo di caricamento, creati una volta da init_load_worker
+worker_session = None
+worker_progress = None
+
+def init_load_worker(progress_queue):
+    """Inizializzatore del pool: apre la sessione del processo, riusata da tutti i suoi intervalli."""
+    global worker_session, worker_progress
+    worker_session = Cluster(CONTACT_POINTS).connect()
+    worker_progress = LoadProgress(progress_queue)
+
+def load_token_range(task):
+    """
+    Carica, con la sessione del processo, le righe di un intervallo di token di un keyspace,
+    lette dal file scritto per quell'intervallo da write_token_slices.
+    """
+    keyspace_name, slice_path, range_index, load_signature = task
+    try:
+        with open(slice_path, 'rb') as slice_file:
+            rows_by_table = pickle.load(slice_file)
+        worker_session.set_keyspace(keyspace_name)
+        for table_name, rows in rows_by_table.items():
+            load_table(worker_session, table_name, rows, len(rows), table_name, range_index, load_signature,
+                       worker_progress)
+        return keyspace_name, range_index, True
+    except Exception as e:
+        print(f"Error during data insertion in '{keyspace_name}' token range {range_index}: {e}")
+        return keyspace_name, range_index, False
+
+# --- Manifest e checkpoint ---
+
+def subset_source_files(base_path, percentage):
+    """File di origine del sottoinsieme, con la stessa logica di scelta di load_subdataset."""
+    percent_str = f"{int(percentage * 100)}"
+    index_file = os.path.join(base_path, "subset_index.csv")
+    npy_dir = os.path.join(base_path, "npy")
+    table_names = ('patients', 'doctors', 'procedures', 'visits')
+    if os.path.isdir(npy_dir):
+        return [index_file] + sorted(
+            os.path.join(directory, file_name)
+            for directory, _, file_names in os.walk(npy_dir) for file_name in file_names
+        )
+    if os.path.exists(index_file):
+        return [index_file] + [os.path.join(base_path, f"{table_name}.csv") for table_name in table_names]
+    return [os.path.join(base_path, f"{table_name}_{percent_str}percent.csv") for table_name in table_names]
+
+def compute_dataset_hash(base_path, percentage):
+    """Hash SHA-256 della percentuale e del contenuto dei file di origine del sottoinsieme."""
+    digest = hashlib.sha256(f"{int(percentage * 100)}".encode())
+    for file_path in subset_source_files(base_path, percentage):
+        digest.update(os.path.relpath(file_path, base_path).encode())
+        with open(file_path, 'rb') as source:
+            while chunk := source.read(1 << 20):
+                digest.update(chunk)
+    return digest.hexdigest()
+
+def prepare_resumable_load(session, keyspace_name, dataset_hash, load_signature):
+    """
+    Restituisce False se il manifest indica che il keyspace contiene già il dataset.
+    Se invece contiene un caricamento completo o parziale diverso (altri file, o un'altra
+    suddivisione in blocchi e intervalli di token) o dati senza manifest né checkpoint,
+    svuota le tabelle prima di ricaricare; un caricamento parziale con la stessa firma
+    viene ripreso dai checkpoint.
+    """
+    session.set_keyspace(keyspace_name)
+    manifest = session.execute(
+        "SELECT dataset_hash FROM load_manifest WHERE keyspace_name = %s", (keyspace_name,)).one()
+    if manifest and manifest.dataset_hash == dataset_hash:
+        return False
+
+    signatures = {row.load_signature for row in session.execute("SELECT load_signature FROM load_checkpoints")}
+    # Senza manifest né checkpoint le tabelle possono contenere comunque dati non tracciati
+    # (es. del caricatore originale con chiavi uuid4), che i contatori sommerebbero al nuovo carico
+    untracked = not manifest and not signatures and any(
+        session.execute(f"SELECT * FROM {table_name} LIMIT 1").one() for table_name in data_tables)
+    if manifest or signatures - {load_signature} or untracked:
+        print(f"Keyspace '{keyspace_name}' holds a different load: truncating tables before reloading.")
+        for table_name in data_tables + ['load_checkpoints', 'load_manifest']:
+            session.execute(f"TRUNCATE {table_name}")
+    elif signatures:
+        print(f"Resuming interrupted load of keyspace '{keyspace_name}' from checkpoints.")
+    return True
+
+def mark_load_complete(session, keyspace_name, dataset_hash):
+    session.set_keyspace(keyspace_name)
+    session.execute(
+        "INSERT INTO load_manifest (keyspace_name, dataset_hash, completed_at) VALUES (%s, %s, toTimestamp(now()))",
+        (keyspace_name, dataset_hash))
+
+def subset_rows(base_path, table_name, percent):
+    """Numero di righe del sottoinsieme, cioè la lunghezza del prefisso da leggere."""
+    index = pd.read_csv(os.path.join(base_path, "subset_index.csv"))
+    return index.loc[(index['table'] == table_name) & (index['percentage'] == percent), 'rows'].item()
+
+def load_tiered_table(base_path, table_name, percent):
+    """
+    Carica il sottoinsieme di una tabella in disposizione 'tiered': il file è ordinato per tier,
+    quindi il sottoinsieme è il prefisso di lunghezza indicata in subset_index.csv.
+    """
+    rows = subset_rows(base_path, table_name, percent)
+    table = pd.read_csv(os.path.join(base_path, f"{table_name}.csv"), encoding='ISO-8859-1', nrows=rows)
+    return table.drop(columns=['tier'])
+
+def load_npy_table(base_path, table_name, percent):
+    """
+    Carica il sottoinsieme di una tabella in formato 'npy' mappando in memoria i file delle colonne.
+    Le colonne intere e le date (datetime64) sono viste sui file, senza copie né parsing; i costi
+    restano interi in centesimi nella colonna 'cost_cents' e diventano Decimal solo in visit_costs.
+    """
+    table_dir = os.path.join(base_path, "npy", table_name)
+    rows = subset_rows(base_path, table_name, percent)
+    schema = pd.read_csv(os.path.join(table_dir, "schema.csv"))
+    columns = {}
+    for column, column_type in zip(schema['column'], schema['type']):
+        if column_type == 'text':
+            offsets = np.load(os.path.join(table_dir, f"{column}.offsets.npy"), mmap_mode='r')[:rows + 1].tolist()
+            data = np.load(os.path.join(table_dir, f"{column}.data.npy"), mmap_mode='r')[:offsets[-1]].tobytes()
+            columns[column] = [data[start:end].decode('utf-8') for start, end in zip(offsets[:-1], offsets[1:])]
+        else:
+            values = np.load(os.path.join(table_dir, f"{column}.npy"), mmap_mode='r')[:rows]
+            columns[f"{column}_cents" if column_type == 'cents' else column] = values
+    return pd.DataFrame(columns, copy=False)
 
 def load_subdataset(base_path, percentage):
     """
     Carica i dataset per la percentuale specificata dalla cartella subdataset.
     """
     percent_str = f"{int(percentage * 100)}"
+    table_names = ('patients', 'doctors', 'procedures', 'visits')
+    if os.path.isdir(os.path.join(base_path, "npy")):
+        return tuple(load_npy_table(base_path, table_name, int(percent_str)) for table_name in table_names)
+    if os.path.exists(os.path.join(base_path, "subset_index.csv")):
+        return tuple(load_tiered_table(base_path, table_name, int(percent_str)) for table_name in table_names)
+
     patients_file = os.path.join(base_path, f"patients_{percent_str}percent.csv")
     doctors_file = os.path.join(base_path, f"doctors_{percent_str}percent.csv")
     procedures_file = os.path.join(base_path, f"procedures_{percent_str}percent.csv")
@@ -214,12 +715,17 @@ def load_subdataset(base_path, percentage):
 def main():
     """Funzione principale per connettersi al cluster, creare keyspace e inserire dati."""
     # Connetti al cluster Cassandra
-    cluster = Cluster(['127.0.0.1'])
+    cluster = Cluster(CONTACT_POINTS)
     session = cluster.connect()
     
     # Percentuali gerarchiche dei dati
     percentages = [1.0, 0.75, 0.50, 0.25]
     base_path = './Dataset/Subsets'  # Path principale dei subdataset
+
+    if LOAD_WORKERS > 1:
+        load_in_parallel(session, base_path, percentages)
+        cluster.shutdown()
+        return
     
     for pct in percentages:
         keyspace_name = f"healthcare_{int(pct*100)}"
@@ -227,16 +733,90 @@ def main():
         
         # Creare e impostare il keyspace e le tabelle
         create_keyspace_and_tables(session, keyspace_name)
+
+        # Saltare il keyspace se contiene già questi file di origine
+        dataset_hash = compute_dataset_hash(base_path, pct)
+        load_signature = f"{dataset_hash}/1/{BATCH_ROWS}"
+        if not prepare_resumable_load(session, keyspace_name, dataset_hash, load_signature):
+            print(f"Keyspace '{keyspace_name}' already matches its source files, skipped.\n")
+            continue
         
         # Caricare i dataset specifici per la percentuale corrente
         patients, doctors, procedures, visits = load_subdataset(base_path, pct)
         
         # Inserire i dati nei keyspace corrispondenti
-        insert_data(session, keyspace_name, patients, doctors, procedures, visits)
-        
-        print(f"Keyspace '{keyspace_name}' created and populated successfully.\n")
+        if insert_data(session, keyspace_name, patients, doctors, procedures, visits, load_signature):
+            mark_load_complete(session, keyspace_name, dataset_hash)
+            print(f"Keyspace '{keyspace_name}' created and populated successfully.\n")
+        else:
+            print(f"Keyspace '{keyspace_name}' not completed: rerun to resume from the last checkpoint.\n")
     
     cluster.shutdown()
 
+def load_in_parallel(session, base_path, percentages):
+    """
+    Crea gli schemi dalla sessione principale, poi carica ogni keyspace con LOAD_WORKERS
+    processi, uno per intervallo di token. Le righe di ogni keyspace vengono costruite e divise
+    per intervallo una sola volta (write_token_slices, un processo per keyspace); ogni processo
+    di caricamento legge solo il file del proprio intervallo. Con PARALLEL_KEYSPACES tutti i
+    keyspace condividono lo stesso pool di processi e vengono caricati contemporaneamente.
+    """
+    keyspace_groups = [percentages] if PARALLEL_KEYSPACES else [[pct] for pct in percentages]
+    progress_queue = Queue()
+    slice_dir = tempfile.mkdtemp(prefix='token_slices_')
+    try:
+        with Pool(LOAD_WORKERS, initializer=init_load_worker, initargs=(progress_queue,)) as pool:
+            for group in keyspace_groups:
+                slice_tasks = []
+                pending = {}  # keyspace -> (hash del dataset, firma del caricamento, intervalli ancora da completare)
+                for pct in group:
+                    keyspace_name = f"healthcare_{int(pct*100)}"
+                    print(f"Processing keyspace '{keyspace_name}'...")
+                    create_keyspace_and_tables(session, keyspace_name)
+                    dataset_hash = compute_dataset_hash(base_path, pct)
+                    load_signature = f"{dataset_hash}/{LOAD_WORKERS}/{BATCH_ROWS}"
+                    if not prepare_resumable_load(session, keyspace_name, dataset_hash, load_signature):
+                        print(f"Keyspace '{keyspace_name}' already matches its source files, skipped.")
+                        continue
+                    slice_tasks.append((keyspace_name, base_path, pct, slice_dir))
+                    pending[keyspace_name] = (dataset_hash, load_signature, LOAD_WORKERS)
+
+                tasks = []
+                total_rows = 0
+                for keyspace_name, range_rows in pool.imap_unordered(write_token_slices, slice_tasks):
+                    if range_rows is None:
+                        continue
+                    load_signature = pending[keyspace_name][1]
+                    for range_index in range(LOAD_WORKERS):
+                        tasks.append((keyspace_name, token_slice_path(slice_dir, keyspace_name, range_index),
+                                      range_index, load_signature))
+                    total_rows += sum(range_rows)
+
+                # Una sola barra per tutti gli intervalli: i processi inviano le righe caricate
+                results = [pool.apply_async(load_token_range, (task,)) for task in tasks]
+                with tqdm(total=total_rows, desc="Caricamento keyspace", unit='rows') as progress:
+                    while True:
+                        finished = all(result.ready() for result in results)
+                        try:
+                            while True:
+                                progress.update(progress_queue.get(timeout=0.2))
+                        except Empty:
+                            pass
+                        if finished:
+                            break
+
+                for keyspace_name, range_index, loaded in (result.get() for result in results):
+                    if not loaded:
+                        continue
+                    print(f"Keyspace '{keyspace_name}' token range {range_index} loaded.")
+                    dataset_hash, load_signature, remaining = pending[keyspace_name]
+                    pending[keyspace_name] = (dataset_hash, load_signature, remaining - 1)
+                    if remaining == 1:
+                        mark_load_complete(session, keyspace_name, dataset_hash)
+                        print(f"Keyspace '{keyspace_name}' created and populated successfully.")
+            print("All keyspaces processed.")
+    finally:
+        shutil.rmtree(slice_dir, ignore_errors=True)
+
 if __name__ == "__main__":
     main()
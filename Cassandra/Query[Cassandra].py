@@ -1,9 +1,25 @@
 import time
 import csv
 from cassandra.cluster import Cluster
+from cassandra.concurrent import execute_concurrent_with_args
+from cassandra.protocol import ProtocolHandler
+from collections import defaultdict
+from datetime import date, timedelta
+from decimal import Decimal
+from functools import partial
+from uuid import uuid4
 import numpy as np
 import os
+import random
+import re
 import scipy.stats as stats
+import sys
+import threading
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'Benchmark'))
+import AdaptiveRunner
+import LoadGenerator
+import ResultStore
 
 # Configurazione della connessione al cluster Cassandra
 contact_points = ['127.0.0.1']  # Cambia con il tuo indirizzo del nodo Cassandra
@@ -14,12 +30,217 @@ keyspace_mappings = {
     "25%": "healthcare_25"
 }
 
+# Livello di complessità Non Onerosità
+queries = {
+    'Query 1': """
+        SELECT doctor_id, COUNT(*) AS total_patients
+        FROM doctor_patient_counts 
+        WHERE visit_date >= '2021-01-01'
+        GROUP BY doctor_id
+        ALLOW FILTERING;
+    """,     
+    'Query 2': """
+        SELECT procedure_id, doctor_specialization, 
+        SUM(procedure_count) AS total_procedures 
+        FROM procedure_visit_stats
+        WHERE visit_date >= '2021-01-01' 
+        AND visit_date <= '2023-12-31'
+        GROUP BY procedure_id, doctor_specialization
+        ALLOW FILTERING;
+    """,
+    'Query 3': """
+        SELECT doctor_id, specialization, SUM(visit_count) AS total_visits 
+        FROM doctor_visits 
+        WHERE visit_date >= '2021-01-01'
+        ALLOW FILTERING;
+    """,
+    'Query 4': """
+        SELECT *
+        FROM patients
+        WHERE birthdate >= '1940-06-21'
+        ALLOW FILTERING; 
+    """
+}
+
+# Varianti di schema confrontate: 'filtered' interroga le tabelle originali con ALLOW FILTERING,
+# 'bucketed' le tabelle partizionate per mese (Query 1-3) e per anno di nascita (Query 4),
+# leggendo solo i bucket dell'intervallo richiesto. 'sai' esegue la Query 4 sull'indice SAI di
+# patients.birthdate, da creare caricando i dati con PATIENT_BIRTHDATE_SAI = True. 'token_scan'
+# esegue le query originali come scansioni parallele per intervallo di token (vedi token_scan_queries)
+SCHEMA_VARIANTS = ['filtered', 'bucketed']
+# Estremo superiore usato per gli intervalli aperti (visit_date >= ...) nello schema per bucket
+QUERY_END_DATE = date.today()
+
+# Ripetizioni adattive (AdaptiveRunner): riscaldamento rilevato e campionamento fino all'intervallo
+# di confidenza desiderato o all'esaurimento del tempo. Con False si usano 101 esecuzioni fisse
+ADAPTIVE_REPETITIONS = True
+
+# Righe per pagina usate nelle misure: ogni esecuzione legge tutte le pagine del risultato
+FETCH_SIZE = 5000
+# Dimensioni di pagina confrontate da sweep_fetch_sizes, con SWEEP_REPETITIONS esecuzioni ciascuna
+FETCH_SIZE_SWEEP = False
+FETCH_SIZES = [100, 1000, 5000, 20000]
+SWEEP_REPETITIONS = 10
+# Modalità strumentata: ogni esecuzione delle query CQL viene tracciata lato server e il profilo
+# (fasi, repliche, righe e tombstone lette) salvato accanto al campione. La traccia rallenta le
+# query, quindi le latenze misurate così non vanno confrontate con quelle senza tracing
+INSTRUMENT = False
+# Test di carico con più client concorrenti (LoadGenerator.CLIENT_COUNTS) al posto delle misure singole
+LOAD_TEST = False
+# Carico misto: letture a frequenza fissa con un flusso concorrente di nuove visite
+# (LoadGenerator.OPEN_LOOP_*). Le visite inserite restano nei keyspace, il cui manifest di caricamento
+# viene cancellato prima della prima scrittura: Dataset[Cassandra] li svuota e li ricarica
+MIXED_WORKLOAD = False
+# Intervallo delle date delle visite inserite, dentro quello letto dalle Query 1-3, e numero
+# massimo di pazienti letti dal keyspace tra cui scegliere
+INGEST_START_DATE = date(2021, 1, 1)
+INGEST_PATIENTS = 10000
+
+# Query sullo schema per bucket: lo statement viene eseguito una volta per ogni bucket ('month'
+# o 'year') dell'intervallo e le righe sono aggregate dal client. 'key_columns' sono le prime
+# colonne usate come chiave di raggruppamento, 'aggregate' è 'count' (COUNT(*)), 'sum' (SUM
+# dell'ultima colonna) o 'rows' (le righe così come sono)
+bucketed_queries = {
+    'Query 1': {
+        'statement': """
+            SELECT doctor_id, total_patients
+            FROM doctor_patient_counts_by_month
+            WHERE visit_month = ? AND visit_date >= ? AND visit_date <= ?
+        """,
+        'bucket': 'month', 'start': date(2021, 1, 1), 'end': None, 'key_columns': 1, 'aggregate': 'count',
+    },
+    'Query 2': {
+        'statement': """
+            SELECT procedure_id, doctor_specialization, procedure_count
+            FROM procedure_visit_stats_by_month
+            WHERE visit_month = ? AND visit_date >= ? AND visit_date <= ?
+        """,
+        'bucket': 'month', 'start': date(2021, 1, 1), 'end': date(2023, 12, 31), 'key_columns': 2, 'aggregate': 'sum',
+    },
+    'Query 3': {
+        # Come la Query 3 originale (SUM senza GROUP BY) restituisce il totale complessivo
+        'statement': """
+            SELECT visit_count
+            FROM doctor_visits_by_month
+            WHERE visit_month = ? AND visit_date >= ? AND visit_date <= ?
+        """,
+        'bucket': 'month', 'start': date(2021, 1, 1), 'end': None, 'key_columns': 0, 'aggregate': 'sum',
+    },
+    'Query 4': {
+        'statement': """
+            SELECT *
+            FROM patients_by_birth_year
+            WHERE birth_year = ? AND birthdate >= ? AND birthdate <= ?
+        """,
+        'bucket': 'year', 'start': date(1940, 6, 21), 'end': None, 'key_columns': 0, 'aggregate': 'rows',
+    },
+}
+
+# Scansione parallela: l'anello dei token Murmur3 viene diviso in SCAN_RANGES intervalli di uguale
+# ampiezza, interrogati con al più SCAN_CONCURRENCY richieste in volo
+SCAN_RANGES = 64
+SCAN_CONCURRENCY = 32
+
+# Query originali ristrette a un intervallo di token della chiave di partizione. Ogni partizione
+# cade in un solo intervallo, quindi i COUNT e le SUM parziali calcolati da Cassandra per
+# intervallo vengono sommati dal client ('key_columns' e 'aggregate' come in bucketed_queries)
+token_scan_queries = {
+    'Query 1': {
+        'statement': """
+            SELECT doctor_id, COUNT(*) AS total_patients
+            FROM doctor_patient_counts
+            WHERE token(doctor_id) > ? AND token(doctor_id) <= ?
+            AND visit_date >= '2021-01-01'
+            GROUP BY doctor_id
+            ALLOW FILTERING
+        """,
+        'key_columns': 1, 'aggregate': 'sum',
+    },
+    'Query 2': {
+        'statement': """
+            SELECT procedure_id, doctor_specialization, SUM(procedure_count) AS total_procedures
+            FROM procedure_visit_stats
+            WHERE token(procedure_id, doctor_specialization) > ? AND token(procedure_id, doctor_specialization) <= ?
+            AND visit_date >= '2021-01-01'
+            AND visit_date <= '2023-12-31'
+            GROUP BY procedure_id, doctor_specialization
+            ALLOW FILTERING
+        """,
+        'key_columns': 2, 'aggregate': 'sum',
+    },
+    'Query 3': {
+        'statement': """
+            SELECT SUM(visit_count) AS total_visits
+            FROM doctor_visits
+            WHERE token(doctor_id, specialization) > ? AND token(doctor_id, specialization) <= ?
+            AND visit_date >= '2021-01-01'
+            ALLOW FILTERING
+        """,
+        'key_columns': 0, 'aggregate': 'sum',
+    },
+    'Query 4': {
+        'statement': """
+            SELECT *
+            FROM patients
+            WHERE token(id) > ? AND token(id) <= ?
+            AND birthdate >= '1940-06-21'
+            ALLOW FILTERING
+        """,
+        'key_columns': 0, 'aggregate': 'rows',
+    },
+}
+
+# Scritture di una nuova visita: la riga in visits e l'incremento di ogni contatore che la
+# include, nelle tabelle originali e in quelle per mese (come in Dataset[Cassandra])
+ingest_statements = {
+    'visits': "INSERT INTO visits (id, date, cost, patient_id, doctor_id, procedure_id, duration) VALUES (?, ?, ?, ?, ?, ?, ?)",
+    'patient_visit_counts': "UPDATE patient_visit_counts SET visit_count = visit_count + 1 WHERE patient_id = ? AND visit_date = ?",
+    'doctor_visits': "UPDATE doctor_visits SET visit_count = visit_count + 1 WHERE doctor_id = ? AND specialization = ? AND visit_date = ?",
+    'procedure_visit_stats': "UPDATE procedure_visit_stats SET procedure_count = procedure_count + 1 WHERE procedure_id = ? AND doctor_specialization = ? AND visit_date = ?",
+    'doctor_patient_counts': "UPDATE doctor_patient_counts SET total_patients = total_patients + 1 WHERE doctor_id = ? AND visit_date = ?",
+    'doctor_patient_counts_by_month': "UPDATE doctor_patient_counts_by_month SET total_patients = total_patients + 1 WHERE visit_month = ? AND visit_date = ? AND doctor_id = ?",
+    'procedure_visit_stats_by_month': "UPDATE procedure_visit_stats_by_month SET procedure_count = procedure_count + 1 WHERE visit_month = ? AND visit_date = ? AND procedure_id = ? AND doctor_specialization = ?",
+    'doctor_visits_by_month': "UPDATE doctor_visits_by_month SET visit_count = visit_count + 1 WHERE visit_month = ? AND visit_date = ? AND doctor_id = ? AND specialization = ?",
+}
+
+# Query 4 sull'indice SAI: lo stesso predicato della Query 4 originale, senza ALLOW FILTERING
+sai_queries = {
+    'Query 4': """
+        SELECT *
+        FROM patients
+        WHERE birthdate >= '1940-06-21';
+    """
+}
+
+class ByteCountingProtocolHandler(ProtocolHandler):
+    """
+    ProtocolHandler del driver che somma in bytes_received la lunghezza dei messaggi ricevuti.
+    Ogni connessione usa una propria sottoclasse (counting_protocol_handler), quindi il contatore
+    non include i byte ricevuti dalle altre sessioni aperte nello stesso processo.
+    """
+    bytes_received = 0
+    _lock = threading.Lock()
+
+    @classmethod
+    def decode_message(cls, protocol_version, *args):
+        # Il corpo del messaggio è il terzultimo argomento in tutte le versioni del driver
+        with cls._lock:
+            cls.bytes_received += len(args[-3])
+        return super(ByteCountingProtocolHandler, cls).decode_message(protocol_version, *args)
+
+def counting_protocol_handler():
+    """Sottoclasse di ByteCountingProtocolHandler con un proprio contatore, per una sola sessione."""
+    return type('ByteCountingProtocolHandler', (ByteCountingProtocolHandler,), {'bytes_received': 0})
+
 # Creazione della classe per gestire la connessione e le query
 class CassandraConnection:
-    def __init__(self, contact_points, keyspace):
+    def __init__(self, contact_points, keyspace, instrument=False):
         self._cluster = Cluster(contact_points)
         self._session = self._cluster.connect()
         self._session.set_keyspace(keyspace)
+        self._session.client_protocol_handler = counting_protocol_handler()
+        self._session.default_fetch_size = FETCH_SIZE
+        self.instrument = instrument  # Le misure tracciano le query (measure_query con trace=True)
 
     def close(self):
         self._cluster.shutdown()
@@ -27,12 +248,188 @@ class CassandraConnection:
     def execute_query(self, query):
         return self._session.execute(query)
 
-# Funzione per eseguire la query e misurare il tempo di esecuzione
-def measure_query_time(session, query):
+# Messaggi degli eventi di traccia con le righe lette da una replica: lettura di partizione
+# ("Read 10 live rows and 0 tombstone cells") e scansione di intervallo con filtro
+TRACE_READ_PATTERN = re.compile(r'Read (\d+) live (?:rows )?and (\d+) tombstone')
+TRACE_SCAN_PATTERN = re.compile(r'Scanned (\d+) rows and matched (\d+)')
+
+def trace_profile(traces):
+    """
+    Riassume le tracce di un'esecuzione (una per pagina richiesta): durata lato server, coordinatori
+    e repliche coinvolte, righe vive, tombstone e righe scandite, più l'elenco delle fasi. La durata
+    di ogni fase è il tempo fino all'evento successivo sulla stessa replica (in microsecondi).
+    """
+    profile = {'server_duration_us': 0, 'coordinators': set(), 'replicas': set(),
+               'live_rows': 0, 'tombstones': 0, 'scanned_rows': 0, 'stages': []}
+    for trace in traces:
+        if trace.duration is not None:
+            profile['server_duration_us'] += trace.duration.total_seconds() * 1e6
+        profile['coordinators'].add(str(trace.coordinator))
+        events_by_source = defaultdict(list)
+        for event in trace.events:
+            events_by_source[str(event.source)].append(event)
+        for source, events in events_by_source.items():
+            profile['replicas'].add(source)
+            elapsed = [event.source_elapsed.total_seconds() * 1e6 if event.source_elapsed else 0 for event in events]
+            for index, event in enumerate(events):
+                profile['stages'].append({
+                    'source': source,
+                    'thread': event.thread_name,
+                    'description': event.description,
+                    'elapsed_us': elapsed[index],
+                    'duration_us': elapsed[index + 1] - elapsed[index] if index + 1 < len(events) else 0,
+                })
+                if match := TRACE_READ_PATTERN.search(event.description):
+                    profile['live_rows'] += int(match.group(1))
+                    profile['tombstones'] += int(match.group(2))
+                elif match := TRACE_SCAN_PATTERN.search(event.description):
+                    profile['scanned_rows'] += int(match.group(1))
+    profile['coordinators'] = sorted(profile['coordinators'])
+    profile['replicas'] = sorted(profile['replicas'])
+    return profile
+
+def year_buckets(start, end):
+    """Anni compresi tra start ed end."""
+    return list(range(start.year, end.year + 1))
+
+def month_buckets(start, end):
+    """Valori visit_month (anno * 100 + mese) dei mesi compresi tra start ed end."""
+    buckets = []
+    year, month = start.year, start.month
+    while (year, month) <= (end.year, end.month):
+        buckets.append(year * 100 + month)
+        year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+    return buckets
+
+def token_ranges(count):
+    """Estremi (escluso, incluso] di 'count' intervalli contigui che coprono l'anello dei token."""
+    bounds = [-2**63 + (2**64 - 1) * i // count for i in range(count + 1)]
+    return list(zip(bounds[:-1], bounds[1:]))
+
+def aggregate_results(results, query):
+    """Unisce i risultati delle sotto-query secondo 'key_columns' e 'aggregate' di query."""
+    if query['aggregate'] == 'rows':
+        return [row for _, rows in results for row in rows]
+
+    totals = defaultdict(int)
+    key_columns = query['key_columns']
+    for _, rows in results:
+        for row in rows:
+            totals[tuple(row[:key_columns])] += 1 if query['aggregate'] == 'count' else (row[-1] or 0)
+    return totals
+
+def execute_bucketed_query(session, statement, query):
+    """Esegue lo statement preparato su ogni bucket dell'intervallo e aggrega i risultati."""
+    end = query['end'] or QUERY_END_DATE
+    buckets = year_buckets(query['start'], end) if query['bucket'] == 'year' else month_buckets(query['start'], end)
+    parameters = [(bucket, query['start'], end) for bucket in buckets]
+    results = execute_concurrent_with_args(session, statement, parameters, raise_on_first_error=True)
+    return aggregate_results(results, query)
+
+def execute_token_scan(session, statement, query):
+    """Esegue lo statement preparato su ogni intervallo di token, in parallelo, e unisce i parziali."""
+    results = execute_concurrent_with_args(session, statement, token_ranges(SCAN_RANGES),
+                                           concurrency=SCAN_CONCURRENCY, raise_on_first_error=True)
+    return aggregate_results(results, query)
+
+def build_queries_by_schema(session):
+    """Query da misurare per ogni variante di SCHEMA_VARIANTS, con gli statement preparati sulla sessione."""
+    queries_by_schema = {}
+    if 'filtered' in SCHEMA_VARIANTS:
+        queries_by_schema['filtered'] = queries
+    if 'bucketed' in SCHEMA_VARIANTS:
+        queries_by_schema['bucketed'] = {
+            query_name: partial(execute_bucketed_query, statement=session.prepare(query['statement']), query=query)
+            for query_name, query in bucketed_queries.items()
+        }
+    if 'sai' in SCHEMA_VARIANTS:
+        queries_by_schema['sai'] = sai_queries
+    if 'token_scan' in SCHEMA_VARIANTS:
+        queries_by_schema['token_scan'] = {
+            query_name: partial(execute_token_scan, statement=session.prepare(query['statement']), query=query)
+            for query_name, query in token_scan_queries.items()
+        }
+    return queries_by_schema
+
+def measure_query(session, query, trace=False):
+    """
+    Esegue la query leggendo tutte le pagine del risultato e restituisce tempo alla prima riga,
+    tempo all'ultima riga (in ms), numero di righe e byte ricevuti. Per le varianti aggregate dal
+    client la prima riga è disponibile solo a unione completata, quindi i due tempi coincidono.
+    Con trace=True le query CQL vengono tracciate e il profilo (trace_profile) è in 'profile':
+    le tracce sono lette dopo la misura, le varianti aggregate dal client non sono tracciate.
+    """
+    protocol_handler = session.client_protocol_handler  # Contatore dei byte di questa sessione
+    bytes_before = protocol_handler.bytes_received
     start_time = time.perf_counter()  # Uso di perf_counter per maggiore precisione
-    session.execute(query)
+    first_row_time = None
+    if callable(query):
+        rows = len(query(session))  # Query per bucket o per token: più richieste e unione lato client
+    else:
+        rows = 0
+        result = session.execute(query, trace=trace)
+        for _ in result:  # L'iterazione richiede le pagine successive alla prima
+            if first_row_time is None:
+                first_row_time = time.perf_counter()
+            rows += 1
     end_time = time.perf_counter()
-    return (end_time - start_time) * 1000  # Conversione in millisecondi
+    if first_row_time is None:
+        first_row_time = end_time
+    measurement = {
+        'ttfr': (first_row_time - start_time) * 1000,  # Conversione in millisecondi
+        'ttlr': (end_time - start_time) * 1000,
+        'rows': rows,
+        'bytes': protocol_handler.bytes_received - bytes_before,
+    }
+    if trace and not callable(query):
+        measurement['profile'] = trace_profile(result.get_all_query_traces())
+    return measurement
+
+# Funzione per eseguire la query e misurare il tempo di esecuzione
+def measure_query_time(session, query):
+    return measure_query(session, query)['ttlr']
+
+def build_visit_ingest(session):
+    """
+    Restituisce una funzione che registra una nuova visita: paziente, medico, procedura e data
+    sono scelti a caso tra quelli del keyspace, e le otto scritture partono in parallelo.
+    """
+    patient_ids = [row.id for row in session.execute(f"SELECT id FROM patients LIMIT {INGEST_PATIENTS}")]
+    doctors = [(row.id, row.specialization) for row in session.execute("SELECT id, specialization FROM doctors")]
+    procedure_ids = [row.id for row in session.execute("SELECT id FROM procedures")]
+    statements = {name: session.prepare(statement) for name, statement in ingest_statements.items()}
+    date_span = (QUERY_END_DATE - INGEST_START_DATE).days + 1
+
+    # Le scritture cambiano righe e contatori del dataset caricato: senza manifest né checkpoint
+    # Dataset[Cassandra] non salta più il keyspace, ma lo svuota e lo ricarica dai file di origine
+    load_tables = session.cluster.metadata.keyspaces[session.keyspace].tables
+    for table_name in ('load_manifest', 'load_checkpoints'):
+        if table_name in load_tables:
+            session.execute(f"TRUNCATE {table_name}")
+    print(f"Load manifest of keyspace '{session.keyspace}' cleared: reload it with Dataset[Cassandra].py after the test.")
+
+    def ingest():
+        patient_id = random.choice(patient_ids)
+        doctor_id, specialization = random.choice(doctors)
+        procedure_id = random.choice(procedure_ids)
+        visit_date = INGEST_START_DATE + timedelta(days=random.randrange(date_span))
+        visit_month = visit_date.year * 100 + visit_date.month
+        cost = Decimal(f"{random.uniform(50, 500):.2f}")
+        parameters = {
+            'visits': (uuid4(), visit_date, cost, patient_id, doctor_id, procedure_id, random.randint(15, 120)),
+            'patient_visit_counts': (patient_id, visit_date),
+            'doctor_visits': (doctor_id, specialization, visit_date),
+            'procedure_visit_stats': (procedure_id, specialization, visit_date),
+            'doctor_patient_counts': (doctor_id, visit_date),
+            'doctor_patient_counts_by_month': (visit_month, visit_date, doctor_id),
+            'procedure_visit_stats_by_month': (visit_month, visit_date, procedure_id, specialization),
+            'doctor_visits_by_month': (visit_month, visit_date, doctor_id, specialization),
+        }
+        futures = [session.execute_async(statements[name], parameters[name]) for name in statements]
+        for future in futures:
+            future.result()
+
+    return ingest
 
 # Funzione per calcolare l'intervallo di confidenza
 def calculate_confidence_interval(data, confidence=0.95):
@@ -48,38 +445,7 @@ def calculate_confidence_interval(data, confidence=0.95):
 def process_datasets():
     all_response_times = []  # Lista per memorizzare i risultati di tutte le query
     first_execution_times = []  # Lista per memorizzare i tempi della prima esecuzione
-
-    # Livello di complessità Non Onerosità
-    queries = {
-        'Query 1': """
-            SELECT doctor_id, COUNT(*) AS total_patients
-            FROM doctor_patient_counts 
-            WHERE visit_date >= '2021-01-01'
-            GROUP BY doctor_id
-            ALLOW FILTERING;
-        """,     
-        'Query 2': """
-            SELECT procedure_id, doctor_specialization, 
-            SUM(procedure_count) AS total_procedures 
-            FROM procedure_visit_stats
-            WHERE visit_date >= '2021-01-01' 
-            AND visit_date <= '2023-12-31'
-            GROUP BY procedure_id, doctor_specialization
-            ALLOW FILTERING;
-        """,
-        'Query 3': """
-            SELECT doctor_id, specialization, SUM(visit_count) AS total_visits 
-            FROM doctor_visits 
-            WHERE visit_date >= '2021-01-01'
-            ALLOW FILTERING;
-        """,
-        'Query 4': """
-            SELECT *
-            FROM patients
-            WHERE birthdate >= '1940-06-21'
-            ALLOW FILTERING; 
-        """
-    }
+    recorder = ResultStore.RunRecorder('Cassandra')  # Campioni grezzi di tutte le esecuzioni
 
     # Creazione della cartella ResponseTimes all'interno della directory corrente
     output_directory = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'ResponseTimes')
@@ -87,54 +453,97 @@ def process_datasets():
 
     # Ciclo sui dataset partendo dal 100% fino al 25%
     for percent, keyspace in keyspace_mappings.items():
-        db = CassandraConnection(contact_points, keyspace)
-        
-        for query_name, query in queries.items():
-            response_times = []  # Lista per memorizzare i tempi di esecuzione della query
-
-            # Esecuzione della query 101 volte con un breve ritardo tra le esecuzioni
-            for i in range(101):
-                elapsed_time = measure_query_time(db._session, query)
-                if i == 0:
-                    # La prima esecuzione viene registrata separatamente
-                    first_execution_time = elapsed_time
-                else:
-                    # Le successive 100 esecuzioni sono registrate per il calcolo della media
-                    response_times.append(elapsed_time)
-                print(f"Dataset: {percent} - {query_name} execution {i+1}: {elapsed_time:.2f} ms")
-                time.sleep(0.001)  # Ritardo di 1 millisecondo tra le esecuzioni
-
-            # Calcolo delle statistiche per le 100 esecuzioni successive
+        db = CassandraConnection(contact_points, keyspace, instrument=INSTRUMENT)
+
+        # Le varianti di schema vengono misurate una dopo l'altra sullo stesso keyspace
+        queries_by_schema = build_queries_by_schema(db._session)
+
+        for schema, query_name, query in (
+            (schema, query_name, query)
+            for schema, schema_queries in queries_by_schema.items()
+            for query_name, query in schema_queries.items()
+        ):
+            measurements = []  # Misure di tutte le esecuzioni della query
+
+            def execute():
+                measurement = measure_query(db._session, query, trace=db.instrument)
+                print(f"Dataset: {percent} - {query_name} ({schema}) execution {len(measurements) + 1}: {measurement['ttlr']:.2f} ms "
+                      f"(first row {measurement['ttfr']:.2f} ms, {measurement['rows']} rows, {measurement['bytes']} bytes)")
+                measurements.append(measurement)
+                return measurement
+
+            if ADAPTIVE_REPETITIONS:
+                _, warmup, stop_reason = AdaptiveRunner.run_adaptive(execute, latency_of=lambda measurement: measurement['ttlr'])
+                print(f"Dataset: {percent} - {query_name} ({schema}): {len(measurements)} executions, "
+                      f"{warmup} warm-up, stopped by {stop_reason}")
+            else:
+                # Esecuzione della query 101 volte con un breve ritardo tra le esecuzioni
+                warmup = 1
+                for i in range(101):
+                    execute()
+                    time.sleep(0.001)  # Ritardo di 1 millisecondo tra le esecuzioni
+
+            # La prima esecuzione viene registrata separatamente; quelle dopo il riscaldamento
+            # sono usate per il calcolo della media
+            first_execution_time = measurements[0]['ttlr']
+            response_times = [measurement['ttlr'] for measurement in measurements[warmup:]]
+            first_row_times = [measurement['ttfr'] for measurement in measurements[warmup:]]
+            for i, measurement in enumerate(measurements):
+                recorder.add(percent, query_name, i, measurement['ttlr'], schema=schema, ttfr_ms=measurement['ttfr'],
+                             rows=measurement['rows'], bytes=measurement['bytes'], steady=i >= warmup)
+                if 'profile' in measurement:
+                    recorder.add_profile(percent, query_name, i, measurement['profile'], schema=schema)
+            recorder.record_warmup(percent, query_name, warmup, schema=schema)
+
+            # Calcolo delle statistiche per le esecuzioni a regime
             if response_times:
                 average_time_exact = np.mean(response_times)  # Media esatta
                 average_time_rounded = round(average_time_exact, 2)  # Media arrotondata
                 average, margin_of_error = calculate_confidence_interval(response_times)
                 confidence_interval = (average - margin_of_error, average + margin_of_error)
             else:
-                average_time_rounded = average = margin_of_error = confidence_interval = (np.nan, np.nan)
+                # Nessuna esecuzione a regime (es. una sola esecuzione oltre il tempo di AdaptiveRunner)
+                average_time_rounded = average = margin_of_error = confidence_interval = None
+            # Percentili dall'istogramma HDR: mostrano le code che media e intervallo nascondono
+            percentiles = ResultStore.hdr_percentiles(response_times, [50, 99, 99.9])
 
             # Aggiungi i risultati alla lista di tutti i risultati
             all_response_times.append({
                 'Dataset': percent,
+                'Schema': schema,
                 'Query': query_name,
                 'Average of 100 Executions (ms)': f"{average_time_rounded:.2f}" if average_time_rounded is not None else 'N/A',
                 'Average Time (ms)': f"{average:.6f}" if average is not None else 'N/A',
-                'Confidence Interval (Min, Max)': f"({confidence_interval[0]:.2f}, {confidence_interval[1]:.2f})" if confidence_interval is not None else 'N/A'
+                'Confidence Interval (Min, Max)': f"({confidence_interval[0]:.2f}, {confidence_interval[1]:.2f})" if confidence_interval is not None else 'N/A',
+                'Average Time to First Row (ms)': f"{np.mean(first_row_times):.2f}" if first_row_times else 'N/A',
+                'Rows': measurements[-1]['rows'],
+                'Bytes Received': measurements[-1]['bytes'],
+                'Executions': len(response_times),
+                'Warm-up Executions': warmup,
+                'p50 (ms)': f"{percentiles[50]:.2f}" if response_times else 'N/A',
+                'p99 (ms)': f"{percentiles[99]:.2f}" if response_times else 'N/A',
+                'p99.9 (ms)': f"{percentiles[99.9]:.2f}" if response_times else 'N/A',
             })
 
             # Scrittura del tempo della prima esecuzione
             first_execution_times.append({
                 'Dataset': percent,
+                'Schema': schema,
                 'Query': query_name,
                 'First Execution Time (ms)': f"{first_execution_time:.2f}"
             })
 
         db.close()
 
+    run_id = recorder.save()
+    print(f"Raw samples stored as run '{run_id}'.")
+
     # Scrittura dei risultati nel file CSV cassandra_response_times_average_100.csv
     response_times_file = os.path.join(output_directory, 'cassandra_100_avg_execution.csv')
     with open(response_times_file, 'w', newline='') as csvfile:
-        fieldnames = ['Dataset', 'Query', 'Average of 100 Executions (ms)', 'Average Time (ms)', 'Confidence Interval (Min, Max)']
+        fieldnames = ['Dataset', 'Schema', 'Query', 'Average of 100 Executions (ms)', 'Average Time (ms)', 'Confidence Interval (Min, Max)',
+                      'Average Time to First Row (ms)', 'Rows', 'Bytes Received', 'p50 (ms)', 'p99 (ms)', 'p99.9 (ms)',
+                      'Executions', 'Warm-up Executions']
         writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
         writer.writeheader()
         writer.writerows(all_response_times)
@@ -142,10 +551,105 @@ def process_datasets():
     # Scrittura dei risultati nel file CSV cassandra_times_of_response_first_execution.csv
     first_execution_times_file = os.path.join(output_directory, 'cassandra_first_execution.csv')
     with open(first_execution_times_file, 'w', newline='') as csvfile:
-        fieldnames = ['Dataset', 'Query', 'First Execution Time (ms)']
+        fieldnames = ['Dataset', 'Schema', 'Query', 'First Execution Time (ms)']
         writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
         writer.writeheader()
         writer.writerows(first_execution_times)
 
+# Funzione per confrontare le dimensioni di pagina e salvare i risultati nel CSV
+def sweep_fetch_sizes():
+    """
+    Misura ogni query con ciascuna dimensione di pagina di FETCH_SIZES e scrive in
+    cassandra_fetch_size_sweep.csv i tempi medi, marcando per ogni query la dimensione con
+    il tempo all'ultima riga più basso.
+    """
+    sweep_results = []
+    for percent, keyspace in keyspace_mappings.items():
+        db = CassandraConnection(contact_points, keyspace)
+        queries_by_schema = build_queries_by_schema(db._session)
+        for schema, schema_queries in queries_by_schema.items():
+            for query_name, query in schema_queries.items():
+                query_results = []
+                for fetch_size in FETCH_SIZES:
+                    db._session.default_fetch_size = fetch_size
+                    measure_query(db._session, query)  # Esecuzione di riscaldamento
+                    measurements = [measure_query(db._session, query) for _ in range(SWEEP_REPETITIONS)]
+                    query_results.append({
+                        'Dataset': percent,
+                        'Schema': schema,
+                        'Query': query_name,
+                        'Fetch Size': fetch_size,
+                        'Average Time to First Row (ms)': f"{np.mean([m['ttfr'] for m in measurements]):.2f}",
+                        'Average Time to Last Row (ms)': f"{np.mean([m['ttlr'] for m in measurements]):.2f}",
+                        'Rows': measurements[-1]['rows'],
+                        'Bytes Received': measurements[-1]['bytes'],
+                    })
+                best = min(query_results, key=lambda result: float(result['Average Time to Last Row (ms)']))
+                for result in query_results:
+                    result['Best'] = result is best
+                print(f"Dataset: {percent} - {query_name} ({schema}) best fetch size: {best['Fetch Size']} "
+                      f"({best['Average Time to Last Row (ms)']} ms)")
+                sweep_results.extend(query_results)
+        db.close()
+
+    output_directory = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'ResponseTimes')
+    os.makedirs(output_directory, exist_ok=True)
+    sweep_file = os.path.join(output_directory, 'cassandra_fetch_size_sweep.csv')
+    with open(sweep_file, 'w', newline='') as csvfile:
+        fieldnames = ['Dataset', 'Schema', 'Query', 'Fetch Size', 'Average Time to First Row (ms)',
+                      'Average Time to Last Row (ms)', 'Rows', 'Bytes Received', 'Best']
+        writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
+        writer.writeheader()
+        writer.writerows(sweep_results)
+
+# Funzione per misurare throughput e latenze sotto carico concorrente e salvare i risultati nel CSV
+def run_load_test():
+    load_results = []
+    recorder = ResultStore.RunRecorder('Cassandra-load')  # Latenze grezze di ogni livello di carico
+    for percent, keyspace in keyspace_mappings.items():
+        db = CassandraConnection(contact_points, keyspace)
+        for schema, schema_queries in build_queries_by_schema(db._session).items():
+            for query_name, query in schema_queries.items():
+                labels = {'Backend': 'Cassandra', 'Dataset': percent, 'Schema': schema, 'Query': query_name}
+                rows = LoadGenerator.sweep_clients(partial(measure_query, db._session, query), labels, recorder)
+                clients, qps = LoadGenerator.saturation_point(rows)
+                print(f"Dataset: {percent} - {query_name} ({schema}) peak throughput {qps} QPS at {clients} clients")
+                load_results.extend(rows)
+        db.close()
+
+    run_id = recorder.save()
+    print(f"Raw samples stored as run '{run_id}'.")
+
+    output_directory = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'ResponseTimes')
+    os.makedirs(output_directory, exist_ok=True)
+    LoadGenerator.write_load_results(os.path.join(output_directory, 'cassandra_load_test.csv'), load_results)
+
+# Funzione per misurare le letture durante un flusso di scritture e salvare i risultati nel CSV
+def run_mixed_workload():
+    mixed_results = []
+    recorder = ResultStore.RunRecorder('Cassandra-mixed')  # Latenze grezze di letture e scritture
+    for percent, keyspace in keyspace_mappings.items():
+        db = CassandraConnection(contact_points, keyspace)
+        ingest = build_visit_ingest(db._session)
+        for schema, schema_queries in build_queries_by_schema(db._session).items():
+            for query_name, query in schema_queries.items():
+                labels = {'Backend': 'Cassandra', 'Dataset': percent, 'Schema': schema, 'Query': query_name}
+                mixed_results.extend(LoadGenerator.sweep_write_rates(partial(measure_query, db._session, query), ingest, labels, recorder))
+        db.close()
+
+    run_id = recorder.save()
+    print(f"Raw samples stored as run '{run_id}'.")
+
+    output_directory = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'ResponseTimes')
+    os.makedirs(output_directory, exist_ok=True)
+    LoadGenerator.write_load_results(os.path.join(output_directory, 'cassandra_mixed_workload.csv'), mixed_results)
+
 if __name__ == "__main__":
-    process_datasets()
+    if LOAD_TEST:
+        run_load_test()
+    elif MIXED_WORKLOAD:
+        run_mixed_workload()
+    else:
+        process_datasets()
+        if FETCH_SIZE_SWEEP:
+            sweep_fetch_sizes()
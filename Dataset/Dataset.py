@@ -1,21 +1,98 @@
 import random
 import csv
+from datetime import date, timedelta
 from faker import Faker
+import numpy as np
+import io
 import os
+import shutil
+from multiprocessing import Pool
 
 # Crea un'istanza del generatore di dati falsi
 fake = Faker()
 
 # Costanti di configurazione
-NUM_PATIENTS = 200000
-NUM_DOCTORS = 8000
-NUM_PROCEDURES = 2000
-NUM_VISITS = 800000
+SCALE_FACTOR = 1  # Fattore di scala (da 1 a 100) applicato a tutte le cardinalità
+NUM_PATIENTS = int(200000 * SCALE_FACTOR)
+NUM_DOCTORS = int(8000 * SCALE_FACTOR)
+NUM_PROCEDURES = int(2000 * SCALE_FACTOR)
+NUM_VISITS = int(800000 * SCALE_FACTOR)
 SUBSET_DIR = 'Dataset/Subsets'  # Cartella dove vengono creati tutti i sottoinsiemi
 
+# Modalità di generazione: 'legacy' (un dict per riga, chiamate Faker per riga),
+# 'vectorized' (colonne NumPy generate in blocco, testi presi da pool Faker)
+# 'streaming' (come 'vectorized', ma a blocchi di CHUNK_SIZE righe a memoria costante)
+# oppure 'parallel' (come 'streaming', con i blocchi generati da WORKERS processi)
+GENERATION_MODE = 'vectorized'
+POOL_SIZE = 5000  # Numero di valori distinti pre-generati per ogni campo testuale
+CHUNK_SIZE = 100000  # Righe per blocco (shard) in modalità 'streaming' e 'parallel'
+WORKERS = os.cpu_count()  # Processi usati in modalità 'parallel'
+
+# Seme globale: a parità di seme e di scala l'output è identico byte per byte,
+# indipendentemente dal numero di processi. REFERENCE_DATE sostituisce la data odierna
+# negli intervalli di date; va fissata per riprodurre lo stesso output in giorni diversi.
+SEED = 42
+REFERENCE_DATE = None  # es. date(2024, 11, 21)
+
+# Distribuzione delle visite (modalità non 'legacy'). Gli esponenti Zipf delle chiavi esterne
+# concentrano le visite su pochi pazienti/medici/procedure (0 = uniforme, 1 = Zipf classico),
+# creando le partizioni calde dei contatori in Cassandra e i supernodi in Neo4j.
+# SEASONAL_AMPLITUDE aggiunge un andamento stagionale alle date delle visite: il giorno più
+# affollato (a metà di SEASONAL_PEAK_MONTH) ha (1 + A) / (1 - A) volte le visite del più vuoto
+PATIENT_SKEW = 0.0
+DOCTOR_SKEW = 0.0
+PROCEDURE_SKEW = 0.0
+SEASONAL_AMPLITUDE = 0.0
+SEASONAL_PEAK_MONTH = 1
+
+# Disposizione dei sottoinsiemi: 'files' scrive una copia CSV per percentuale
+# ({tabella}_{p}percent.csv); 'tiered' scrive un solo {tabella}.csv con la colonna 'tier'
+# (la percentuale più piccola che contiene la riga), ordinato per tier crescente, più l'indice
+# SUBSET_INDEX_FILE: ogni sottoinsieme è un prefisso del file. La modalità 'legacy' usa sempre 'files'
+SUBSET_LAYOUT = 'tiered'
+SUBSET_INDEX_FILE = f'{SUBSET_DIR}/subset_index.csv'
+
+# Formato di output (modalità non 'legacy'): 'csv' oppure 'npy', cioè una cartella per tabella
+# in NPY_DIR con un file .npy tipizzato per colonna, leggibile con np.load(mmap_mode='r').
+# In formato 'npy' le righe sono sempre ordinate per tier e i sottoinsiemi sono prefissi,
+# con lo stesso indice SUBSET_INDEX_FILE della disposizione 'tiered'
+OUTPUT_FORMAT = 'csv'
+NPY_DIR = f'{SUBSET_DIR}/npy'
+
 # Crea la directory 'Subsets' se non esiste
 os.makedirs(SUBSET_DIR, exist_ok=True)
 
+specializations = [
+    'Cardiologist', 'Neurologist', 'Orthopedic Surgeon', 'Pediatrician', 'Dermatologist',
+    'Gynecologist', 'Oncologist', 'Endocrinologist', 'Radiologist', 'General Surgeon'
+]
+
+procedure_descriptions = [
+    'Complete Blood Count (CBC)', 'Basic Metabolic Panel', 'Lipid Panel', 'Liver Function Test',
+    'Kidney Function Test', 'Thyroid Function Test', 'Chest X-Ray', 'Abdominal Ultrasound',
+    'MRI of the Brain', 'CT Scan of the Abdomen', 'Electrocardiogram (ECG)', 'Stress Test'
+]
+
+# Percentuali da considerare: 100%, 75%, 50%, 25%
+percentages = [100, 75, 50, 25]
+
+fieldnames_by_table = {
+    'patients': ['id', 'name', 'birthdate', 'address', 'phone_number', 'email'],
+    'doctors': ['id', 'name', 'specialization', 'address', 'phone_number', 'email'],
+    'procedures': ['id', 'description', 'code'],
+    'visits': ['id', 'date', 'cost', 'patient_id', 'doctor_id', 'procedure_id', 'duration'],
+}
+
+# Tipo di ogni colonna nel formato 'npy': le date sono datetime64[D], i costi interi in
+# centesimi (virgola fissa), i testi un array di offset più un array di byte UTF-8
+column_types = {
+    'id': 'int', 'patient_id': 'int', 'doctor_id': 'int', 'procedure_id': 'int', 'duration': 'int',
+    'birthdate': 'date', 'date': 'date', 'cost': 'cents',
+    'name': 'text', 'address': 'text', 'phone_number': 'text', 'email': 'text',
+    'specialization': 'text', 'description': 'text', 'code': 'text',
+}
+npy_dtypes = {'int': '<i8', 'date': '<M8[D]', 'cents': '<i8'}
+
 # Funzione per generare e scrivere un dataset
 def write_csv(file_path, data, fieldnames):
     with open(file_path, 'w', newline='') as csvfile:
@@ -24,68 +101,25 @@ def write_csv(file_path, data, fieldnames):
         writer.writerows(data)
     print(f"CSV file '{file_path}' created successfully.")
 
-# Genera dati pazienti
-patients = [
-    {
-        'id': patient_id,
-        'name': fake.name(),
-        'birthdate': fake.date_of_birth(minimum_age=65, maximum_age=90).strftime('%Y-%m-%d'),
-        'address': fake.address(),
-        'phone_number': fake.phone_number(),
-        'email': fake.email()
-    }
-    for patient_id in range(1, NUM_PATIENTS + 1)
-]
-
-# Genera dati dottori
-specializations = [
-    'Cardiologist', 'Neurologist', 'Orthopedic Surgeon', 'Pediatrician', 'Dermatologist',
-    'Gynecologist', 'Oncologist', 'Endocrinologist', 'Radiologist', 'General Surgeon'
-]
-
-doctors = [
-    {
-        'id': doctor_id,
-        'name': fake.name(),
-        'specialization': random.choice(specializations),
-        'address': fake.address(),
-        'phone_number': fake.phone_number(),
-        'email': fake.email()
-    }
-    for doctor_id in range(1, NUM_DOCTORS + 1)
-]
-
-# Genera dati procedure
-procedures = [
-    {
-        'id': procedure_id,
-        'description': random.choice([
-            'Complete Blood Count (CBC)', 'Basic Metabolic Panel', 'Lipid Panel', 'Liver Function Test',
-            'Kidney Function Test', 'Thyroid Function Test', 'Chest X-Ray', 'Abdominal Ultrasound',
-            'MRI of the Brain', 'CT Scan of the Abdomen', 'Electrocardiogram (ECG)', 'Stress Test'
-        ]),
-        'code': f'PR{procedure_id:04}'
-    }
-    for procedure_id in range(1, NUM_PROCEDURES + 1)
-]
+# Funzione per convertire in testo CSV (senza intestazione) una tabella colonnare (dict di array),
+# opzionalmente solo le righe in 'index'
+def format_columns_csv(columns, fieldnames, index=None):
+    if index is None:
+        index = slice(None)
+    rows = zip(*(columns[field][index].tolist() for field in fieldnames))
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows(rows)
+    return buffer.getvalue()
 
-# Genera dati visite
-def generate_visit_duration():
-    return random.randint(10, 180)  # Durata in minuti
-
-# Le visite devono essere associate a pazienti, medici e procedure esistenti
-visits = [
-    {
-        'id': visit_id,
-        'date': fake.date_between(start_date='-5y', end_date='today').strftime('%Y-%m-%d'),
-        'cost': round(random.uniform(100.0, 1000.0), 2),
-        'patient_id': random.randint(1, NUM_PATIENTS),  # Paziente esistente
-        'doctor_id': random.randint(1, NUM_DOCTORS),  # Medico esistente
-        'procedure_id': random.randint(1, NUM_PROCEDURES),  # Procedura esistente
-        'duration': generate_visit_duration()
-    }
-    for visit_id in range(1, NUM_VISITS + 1)
-]
+# Funzione per scrivere una tabella colonnare su CSV.
+# Con append=True le righe vengono accodate a un file già esistente, senza intestazione.
+def write_columns_csv(file_path, columns, fieldnames, index=None, append=False):
+    with open(file_path, 'a' if append else 'w', newline='') as csvfile:
+        if not append:
+            csv.writer(csvfile).writerow(fieldnames)
+        csvfile.write(format_columns_csv(columns, fieldnames, index))
+    if not append:
+        print(f"CSV file '{file_path}' created successfully.")
 
 # Funzione per creare sottoinsiemi progressivi (100%, 75%, 50%, 25%)
 def create_progressive_subset(data, percentages):
@@ -97,22 +131,488 @@ def create_progressive_subset(data, percentages):
         subsets.append(current_subset)
     return subsets
 
-# Percentuali da considerare: 100%, 75%, 50%, 25%
-percentages = [100, 75, 50, 25]
+# Come create_progressive_subset, ma lavora su indici di riga invece che sui dati
+def create_progressive_indices(num_rows, percentages, rng):
+    subsets = []
+    current_subset = np.arange(num_rows)
+    for percentage in percentages:
+        subset_size = round(len(current_subset) * percentage / 100)
+        current_subset = rng.choice(current_subset, subset_size, replace=False)
+        subsets.append(current_subset)
+    return subsets
 
-# Generazione dei sottoinsiemi progressivi
-datasets = [
-    ('patients', patients, ['id', 'name', 'birthdate', 'address', 'phone_number', 'email']),
-    ('doctors', doctors, ['id', 'name', 'specialization', 'address', 'phone_number', 'email']),
-    ('procedures', procedures, ['id', 'description', 'code']),
-    ('visits', visits, ['id', 'date', 'cost', 'patient_id', 'doctor_id', 'procedure_id', 'duration']),
-]
+def generate_legacy():
+    """Genera le tabelle come liste di dict, una riga alla volta."""
+    random.seed(SEED)
+    fake.seed_instance(SEED)
+
+    # Genera dati pazienti
+    patients = [
+        {
+            'id': patient_id,
+            'name': fake.name(),
+            'birthdate': fake.date_of_birth(minimum_age=65, maximum_age=90).strftime('%Y-%m-%d'),
+            'address': fake.address(),
+            'phone_number': fake.phone_number(),
+            'email': fake.email()
+        }
+        for patient_id in range(1, NUM_PATIENTS + 1)
+    ]
+
+    # Genera dati dottori
+    doctors = [
+        {
+            'id': doctor_id,
+            'name': fake.name(),
+            'specialization': random.choice(specializations),
+            'address': fake.address(),
+            'phone_number': fake.phone_number(),
+            'email': fake.email()
+        }
+        for doctor_id in range(1, NUM_DOCTORS + 1)
+    ]
+
+    # Genera dati procedure
+    procedures = [
+        {
+            'id': procedure_id,
+            'description': random.choice(procedure_descriptions),
+            'code': f'PR{procedure_id:04}'
+        }
+        for procedure_id in range(1, NUM_PROCEDURES + 1)
+    ]
+
+    # Genera dati visite
+    def generate_visit_duration():
+        return random.randint(10, 180)  # Durata in minuti
+
+    # Le visite devono essere associate a pazienti, medici e procedure esistenti
+    visits = [
+        {
+            'id': visit_id,
+            'date': fake.date_between(start_date='-5y', end_date='today').strftime('%Y-%m-%d'),
+            'cost': round(random.uniform(100.0, 1000.0), 2),
+            'patient_id': random.randint(1, NUM_PATIENTS),  # Paziente esistente
+            'doctor_id': random.randint(1, NUM_DOCTORS),  # Medico esistente
+            'procedure_id': random.randint(1, NUM_PROCEDURES),  # Procedura esistente
+            'duration': generate_visit_duration()
+        }
+        for visit_id in range(1, NUM_VISITS + 1)
+    ]
+
+    # Generazione dei sottoinsiemi progressivi
+    datasets = [
+        ('patients', patients),
+        ('doctors', doctors),
+        ('procedures', procedures),
+        ('visits', visits),
+    ]
+
+    # Creare tutti i sottoinsiemi progressivi (incluso il 100%)
+    for dataset_name, dataset_data in datasets:
+        subsets = create_progressive_subset(dataset_data, percentages)
+
+        # Salva ogni sottoinsieme nella cartella Subsets
+        for i, subset in enumerate(subsets):
+            subset_filename = f'{SUBSET_DIR}/{dataset_name}_{percentages[i]}percent.csv'
+            write_csv(subset_filename, subset, fieldnames_by_table[dataset_name])
+
+# --- Generazione vettoriale ---
+
+def years_ago(reference, years):
+    """Restituisce la data 'years' anni prima di 'reference' (il 29/02 diventa 28/02)."""
+    try:
+        return reference.replace(year=reference.year - years)
+    except ValueError:
+        return reference.replace(year=reference.year - years, day=28)
+
+def reference_date():
+    return REFERENCE_DATE or date.today()
+
+def build_text_pools(size):
+    """Pre-genera con Faker (inizializzato con SEED) un pool di valori per ogni campo testuale."""
+    fake.seed_instance(SEED)
+    return {
+        'name': np.array([fake.name() for _ in range(size)], dtype=object),
+        'address': np.array([fake.address() for _ in range(size)], dtype=object),
+        'phone_number': np.array([fake.phone_number() for _ in range(size)], dtype=object),
+        'email': np.array([fake.email() for _ in range(size)], dtype=object),
+    }
+
+def random_dates(rng, start, end, size):
+    """Date uniformi in [start, end] come datetime64[D] (nel CSV diventano 'YYYY-MM-DD')."""
+    offsets = rng.integers(0, (end - start).days + 1, size)
+    return np.datetime64(start, 'D') + offsets
+
+def seasonal_dates(rng, start, end, size):
+    """
+    Date in [start, end] con densità 1 + A * cos(2π (giorno dell'anno - picco) / 365.25),
+    estratte per inversione della CDF sui giorni dell'intervallo. Con A = 0 equivale a random_dates.
+    """
+    if SEASONAL_AMPLITUDE == 0:
+        return random_dates(rng, start, end, size)
+    days = np.arange(np.datetime64(start, 'D'), np.datetime64(end, 'D') + 1)
+    day_of_year = (days - days.astype('datetime64[Y]')).astype(np.int64)
+    peak_day = (date(2001, SEASONAL_PEAK_MONTH, 15) - date(2001, 1, 1)).days
+    weights = 1 + SEASONAL_AMPLITUDE * np.cos(2 * np.pi * (day_of_year - peak_day) / 365.25)
+    cumulative = np.cumsum(weights)
+    return days[np.searchsorted(cumulative, rng.random(size) * cumulative[-1], side='right')]
+
+def zipf_ids(rng, num_ids, exponent, size):
+    """
+    Id in [1, num_ids] con frequenza circa proporzionale a 1 / rango^exponent (0 = uniforme).
+    Il rango si ottiene invertendo la CDF continua della legge di potenza, senza tabelle grandi
+    quanto num_ids; la permutazione (rango * a + b) mod num_ids, con a primo con num_ids,
+    sparpaglia gli id più frequenti invece di assegnarli a 1, 2, 3...
+    """
+    if exponent == 0:
+        return rng.integers(1, num_ids + 1, size)
+    u = rng.random(size)
+    if exponent == 1:
+        ranks = np.exp(u * np.log(num_ids + 1))
+    else:
+        ranks = (1 + u * ((num_ids + 1) ** (1 - exponent) - 1)) ** (1 / (1 - exponent))
+    ranks = np.minimum(np.floor(ranks).astype(np.int64), num_ids) - 1
+
+    multiplier = int(num_ids * 0.6180339887) | 1
+    while np.gcd(multiplier, num_ids) != 1:
+        multiplier += 2
+    return (ranks * multiplier + SEED) % num_ids + 1
+
+def pick(rng, pool, size):
+    return pool[rng.integers(0, len(pool), size)]
+
+def generate_patients_columns(ids, rng, pools):
+    today = reference_date()
+    # Stesso intervallo di fake.date_of_birth(minimum_age=65, maximum_age=90)
+    birth_start = years_ago(today, 91) + timedelta(days=1)
+    birth_end = years_ago(today, 65)
+    return {
+        'id': ids,
+        'name': pick(rng, pools['name'], len(ids)),
+        'birthdate': random_dates(rng, birth_start, birth_end, len(ids)),
+        'address': pick(rng, pools['address'], len(ids)),
+        'phone_number': pick(rng, pools['phone_number'], len(ids)),
+        'email': pick(rng, pools['email'], len(ids)),
+    }
+
+def generate_doctors_columns(ids, rng, pools):
+    return {
+        'id': ids,
+        'name': pick(rng, pools['name'], len(ids)),
+        'specialization': pick(rng, np.array(specializations, dtype=object), len(ids)),
+        'address': pick(rng, pools['address'], len(ids)),
+        'phone_number': pick(rng, pools['phone_number'], len(ids)),
+        'email': pick(rng, pools['email'], len(ids)),
+    }
+
+def generate_procedures_columns(ids, rng, pools):
+    return {
+        'id': ids,
+        'description': pick(rng, np.array(procedure_descriptions, dtype=object), len(ids)),
+        'code': np.array([f'PR{procedure_id:04}' for procedure_id in ids.tolist()], dtype=object),
+    }
+
+def generate_visits_columns(ids, rng, pools):
+    today = reference_date()
+    # Stesso intervallo di fake.date_between(start_date='-5y', end_date='today')
+    visit_start = today - timedelta(days=5 * 365)
+    return {
+        'id': ids,
+        'date': seasonal_dates(rng, visit_start, today, len(ids)),
+        'cost': np.round(rng.uniform(100.0, 1000.0, len(ids)), 2),
+        'patient_id': zipf_ids(rng, NUM_PATIENTS, PATIENT_SKEW, len(ids)),  # Paziente esistente
+        'doctor_id': zipf_ids(rng, NUM_DOCTORS, DOCTOR_SKEW, len(ids)),  # Medico esistente
+        'procedure_id': zipf_ids(rng, NUM_PROCEDURES, PROCEDURE_SKEW, len(ids)),  # Procedura esistente
+        'duration': rng.integers(10, 181, len(ids)),  # Durata in minuti
+    }
+
+table_generators = {
+    'patients': (NUM_PATIENTS, generate_patients_columns),
+    'doctors': (NUM_DOCTORS, generate_doctors_columns),
+    'procedures': (NUM_PROCEDURES, generate_procedures_columns),
+    'visits': (NUM_VISITS, generate_visits_columns),
+}
+
+def generate_vectorized():
+    """Genera ogni tabella come array colonnari NumPy, con lo stesso schema CSV di generate_legacy."""
+    rng = np.random.default_rng(SEED)
+    pools = build_text_pools(POOL_SIZE)
+    subset_sizes = {}
+
+    for dataset_name, (num_rows, generate_columns) in table_generators.items():
+        columns = generate_columns(np.arange(1, num_rows + 1), rng, pools)
+        subsets = create_progressive_indices(num_rows, percentages, rng)
+
+        # Salva ogni sottoinsieme nella cartella Subsets
+        if SUBSET_LAYOUT == 'tiered' or OUTPUT_FORMAT == 'npy':
+            # Livello di ogni riga: indice dell'ultimo sottoinsieme che la contiene
+            tiers = np.zeros(num_rows, dtype=np.int64)
+            for i, subset in enumerate(subsets):
+                tiers[subset] = i
+            subset_sizes[dataset_name] = [len(subset) for subset in subsets]
+
+        if OUTPUT_FORMAT == 'npy':
+            table_dir = reset_npy_table(dataset_name)
+            append_npy_parts(table_dir, [
+                encode_columns_npy(columns, fieldnames_by_table[dataset_name], tiers == i)
+                for i in range(len(percentages))
+            ])
+            finalize_npy_table(table_dir, fieldnames_by_table[dataset_name])
+            continue
+
+        if SUBSET_LAYOUT == 'tiered':
+            columns['tier'] = np.array(percentages)[tiers]
+            order = np.argsort(-tiers, kind='stable')
+            write_columns_csv(f'{SUBSET_DIR}/{dataset_name}.csv', columns,
+                              fieldnames_by_table[dataset_name] + ['tier'], order)
+            continue
+
+        for i, subset in enumerate(subsets):
+            subset_filename = f'{SUBSET_DIR}/{dataset_name}_{percentages[i]}percent.csv'
+            write_columns_csv(subset_filename, columns, fieldnames_by_table[dataset_name], subset)
+
+    if subset_sizes:
+        write_subset_index(subset_sizes)
+
+# --- Formato binario colonnare (.npy) ---
+
+def encode_columns_npy(columns, fieldnames, index):
+    """
+    Converte le righe selezionate in blocchi di byte, uno per file parziale: i valori grezzi
+    per le colonne a larghezza fissa, lunghezze e byte UTF-8 per le colonne testuali.
+    """
+    parts = {}
+    for field in fieldnames:
+        kind = column_types[field]
+        values = columns[field][index]
+        if kind == 'text':
+            encoded = [value.encode('utf-8') for value in values.tolist()]
+            parts[f'{field}.lengths'] = np.fromiter(map(len, encoded), dtype='<i8', count=len(encoded)).tobytes()
+            parts[f'{field}.data'] = b''.join(encoded)
+        elif kind == 'cents':
+            parts[field] = np.rint(values * 100).astype('<i8').tobytes()
+        else:
+            parts[field] = values.astype(npy_dtypes[kind]).tobytes()
+    return parts
+
+def reset_npy_table(dataset_name):
+    table_dir = f'{NPY_DIR}/{dataset_name}'
+    shutil.rmtree(table_dir, ignore_errors=True)
+    os.makedirs(table_dir)
+    return table_dir
+
+def append_npy_parts(table_dir, tier_parts):
+    """Accoda i blocchi di ogni livello ai rispettivi file parziali ({parte}.tier{p}.part)."""
+    for percentage, parts in zip(percentages, tier_parts):
+        for part_name, payload in parts.items():
+            with open(f'{table_dir}/{part_name}.tier{percentage}.part', 'ab') as part_file:
+                part_file.write(payload)
+
+def write_npy_header(output, dtype, length):
+    np.lib.format.write_array_header_1_0(output, {
+        'descr': np.lib.format.dtype_to_descr(np.dtype(dtype)),
+        'fortran_order': False,
+        'shape': (length,),
+    })
+
+def finalize_npy_table(table_dir, fieldnames):
+    """
+    Unisce i file parziali di ogni colonna, dal livello più piccolo (25%) al più grande,
+    in un unico .npy e scrive schema.csv con il tipo di ogni colonna. I file vengono letti
+    a blocchi, quindi la memoria usata non dipende dalla dimensione della tabella.
+    """
+    tier_order = percentages[::-1]
+    for field in fieldnames:
+        kind = column_types[field]
+        if kind == 'text':
+            # Gli offset (lunghezza n + 1) sono la somma cumulativa delle lunghezze
+            length_parts = [f'{table_dir}/{field}.lengths.tier{percentage}.part' for percentage in tier_order]
+            num_rows = sum(os.path.getsize(part) for part in length_parts) // 8
+            offset = 0
+            with open(f'{table_dir}/{field}.offsets.npy', 'wb') as output:
+                write_npy_header(output, '<i8', num_rows + 1)
+                output.write(np.zeros(1, dtype='<i8').tobytes())
+                for part in length_parts:
+                    with open(part, 'rb') as part_file:
+                        while (lengths := np.fromfile(part_file, dtype='<i8', count=CHUNK_SIZE)).size:
+                            offsets = offset + np.cumsum(lengths)
+                            output.write(offsets.tobytes())
+                            offset = int(offsets[-1])
+                    os.remove(part)
+            concatenate_npy_parts(f'{table_dir}/{field}.data.npy', '|u1', offset,
+                                  [f'{table_dir}/{field}.data.tier{percentage}.part' for percentage in tier_order])
+        else:
+            parts = [f'{table_dir}/{field}.tier{percentage}.part' for percentage in tier_order]
+            num_rows = sum(os.path.getsize(part) for part in parts) // np.dtype(npy_dtypes[kind]).itemsize
+            concatenate_npy_parts(f'{table_dir}/{field}.npy', npy_dtypes[kind], num_rows, parts)
+
+    write_csv(f'{table_dir}/schema.csv',
+              [{'column': field, 'type': column_types[field]} for field in fieldnames], ['column', 'type'])
+
+def concatenate_npy_parts(file_path, dtype, length, parts):
+    with open(file_path, 'wb') as output:
+        write_npy_header(output, dtype, length)
+        for part in parts:
+            with open(part, 'rb') as part_file:
+                shutil.copyfileobj(part_file, output)
+            os.remove(part)
+
+# --- Generazione in streaming ---
+
+def progressive_tier_counts(num_rows, percentages):
+    """
+    Numero di righe per livello di appartenenza. Il livello i contiene le righe presenti
+    nei sottoinsiemi 0..i ma non nel sottoinsieme i+1; le dimensioni dei sottoinsiemi sono
+    le stesse di create_progressive_subset (ogni percentuale si applica al sottoinsieme precedente).
+    """
+    sizes = []
+    current_size = num_rows
+    for percentage in percentages:
+        current_size = round(current_size * percentage / 100)
+        sizes.append(current_size)
+    return np.array([sizes[i] - sizes[i + 1] for i in range(len(sizes) - 1)] + [sizes[-1]], dtype=np.int64)
+
+def write_subset_index(subset_sizes):
+    """Scrive il numero di righe di ogni sottoinsieme, cioè la lunghezza del prefisso da leggere."""
+    rows = [
+        {'table': dataset_name, 'percentage': percentage, 'rows': size}
+        for dataset_name, sizes in subset_sizes.items()
+        for percentage, size in zip(percentages, sizes)
+    ]
+    write_csv(SUBSET_INDEX_FILE, rows, ['table', 'percentage', 'rows'])
+
+def shard_plan(table_index, num_rows):
+    """
+    Suddivide gli id [1, num_rows] in shard di CHUNK_SIZE righe e assegna a ciascuno quanti
+    posti occupa in ogni livello, estraendo senza reinserimento dai posti ancora liberi:
+    le dimensioni finali dei sottoinsiemi sono esatte. Il piano dipende solo da SEED,
+    non dal numero di processi.
+    """
+    plan_rng = np.random.default_rng([SEED, table_index])
+    remaining_counts = progressive_tier_counts(num_rows, percentages)
+    plan = []
+    for shard_index, start in enumerate(range(1, num_rows + 1, CHUNK_SIZE)):
+        stop = min(start + CHUNK_SIZE, num_rows + 1)
+        tier_counts = plan_rng.multivariate_hypergeometric(remaining_counts, stop - start)
+        remaining_counts -= tier_counts
+        plan.append((table_index, shard_index, start, stop, tier_counts))
+    return plan
+
+# Pool di testi del processo corrente, impostati da init_worker
+worker_pools = None
+
+def init_worker(pools):
+    global worker_pools
+    worker_pools = pools
+
+def generate_shard(task):
+    """
+    Genera uno shard con un seme derivato da SEED e dall'indice dello shard, e restituisce
+    per ogni livello il testo CSV delle sue righe (con la colonna 'tier' se SUBSET_LAYOUT è 'tiered'),
+    oppure i blocchi binari di encode_columns_npy se OUTPUT_FORMAT è 'npy'.
+    """
+    table_index, shard_index, start, stop, tier_counts = task
+    dataset_name = list(table_generators)[table_index]
+    generate_columns = table_generators[dataset_name][1]
+    rng = np.random.default_rng(np.random.SeedSequence(SEED, spawn_key=(table_index, shard_index)))
+
+    columns = generate_columns(np.arange(start, stop), rng, worker_pools)
+    tiers = rng.permutation(np.repeat(np.arange(len(tier_counts)), tier_counts))
+    fieldnames = fieldnames_by_table[dataset_name]
+    if OUTPUT_FORMAT == 'npy':
+        return [encode_columns_npy(columns, fieldnames, tiers == i) for i in range(len(percentages))]
+    if SUBSET_LAYOUT == 'tiered':
+        columns['tier'] = np.array(percentages)[tiers]
+        fieldnames = fieldnames + ['tier']
+    return [format_columns_csv(columns, fieldnames, tiers == i) for i in range(len(percentages))]
+
+def concatenate_segments(file_path, header, segment_paths):
+    """Scrive l'intestazione e poi, in ordine, il contenuto dei segmenti, che vengono rimossi."""
+    with open(file_path, 'w', newline='') as output:
+        csv.writer(output).writerow(header)
+        for segment_path in segment_paths:
+            with open(segment_path, newline='') as segment:
+                while chunk := segment.read(1 << 20):
+                    output.write(chunk)
+            os.remove(segment_path)
+    print(f"CSV file '{file_path}' created successfully.")
+
+def generate_streaming(workers=1):
+    """
+    Genera ogni tabella a shard di CHUNK_SIZE righe e li accoda, nell'ordine degli shard,
+    ai file dei sottoinsiemi. L'appartenenza di ogni riga ai sottoinsiemi (100/75/50/25)
+    viene decisa durante la generazione, quindi in memoria ci sono solo gli shard in lavorazione.
+    Con workers > 1 gli shard vengono generati in parallelo da processi separati.
+    In disposizione 'tiered' ogni livello viene accodato a un segmento temporaneo e i segmenti
+    vengono poi concatenati dal livello più piccolo (25%) al più grande.
+    """
+    pools = build_text_pools(POOL_SIZE)
+    pool = Pool(workers, initializer=init_worker, initargs=(pools,)) if workers > 1 else None
+    if pool is None:
+        init_worker(pools)
+
+    subset_sizes = {}
+
+    try:
+        for table_index, (dataset_name, (num_rows, _)) in enumerate(table_generators.items()):
+            fieldnames = fieldnames_by_table[dataset_name]
+            plan = shard_plan(table_index, num_rows)
+            shards = pool.imap(generate_shard, plan) if pool else map(generate_shard, plan)
+            subset_sizes[dataset_name] = np.cumsum(progressive_tier_counts(num_rows, percentages)[::-1])[::-1].tolist()
+
+            if OUTPUT_FORMAT == 'npy':
+                table_dir = reset_npy_table(dataset_name)
+                for tier_parts in shards:
+                    append_npy_parts(table_dir, tier_parts)
+                finalize_npy_table(table_dir, fieldnames)
+                print(f"Streaming generation of '{dataset_name}' completed ({num_rows} rows, {len(plan)} shards).")
+                continue
+
+            if SUBSET_LAYOUT == 'tiered':
+                output_filenames = [f'{SUBSET_DIR}/{dataset_name}.tier{percentage}.part' for percentage in percentages]
+                for output_filename in output_filenames:
+                    open(output_filename, 'w').close()
+            else:
+                output_filenames = [f'{SUBSET_DIR}/{dataset_name}_{percentage}percent.csv' for percentage in percentages]
+                for output_filename in output_filenames:
+                    write_csv(output_filename, [], fieldnames)
+
+            for tier_texts in shards:
+                for i, output_filename in enumerate(output_filenames):
+                    # Un segmento contiene un solo livello, il sottoinsieme i tutti i livelli >= i
+                    text = tier_texts[i] if SUBSET_LAYOUT == 'tiered' else ''.join(tier_texts[i:])
+                    with open(output_filename, 'a', newline='') as csvfile:
+                        csvfile.write(text)
+
+            if SUBSET_LAYOUT == 'tiered':
+                concatenate_segments(f'{SUBSET_DIR}/{dataset_name}.csv', fieldnames + ['tier'], output_filenames[::-1])
+            print(f"Streaming generation of '{dataset_name}' completed ({num_rows} rows, {len(plan)} shards).")
+
+        if SUBSET_LAYOUT == 'tiered' or OUTPUT_FORMAT == 'npy':
+            write_subset_index(subset_sizes)
+    finally:
+        if pool:
+            pool.close()
+            pool.join()
+
+if __name__ == "__main__":
+    if not 1 <= SCALE_FACTOR <= 100:
+        raise ValueError(f"SCALE_FACTOR must be between 1 and 100, got {SCALE_FACTOR}")
+
+    # I loader usano il formato 'npy' o la disposizione 'tiered' se ne trovano i file:
+    # vanno rimossi se non più validi
+    if GENERATION_MODE == 'legacy' or OUTPUT_FORMAT != 'npy':
+        shutil.rmtree(NPY_DIR, ignore_errors=True)
+    if (GENERATION_MODE == 'legacy' or (SUBSET_LAYOUT != 'tiered' and OUTPUT_FORMAT != 'npy')) \
+            and os.path.exists(SUBSET_INDEX_FILE):
+        os.remove(SUBSET_INDEX_FILE)
 
-# Creare tutti i sottoinsiemi progressivi (incluso il 100%)
-for dataset_name, dataset_data, fieldnames in datasets:
-    subsets = create_progressive_subset(dataset_data, percentages)
-    
-    # Salva ogni sottoinsieme nella cartella Subsets
-    for i, subset in enumerate(subsets):
-        subset_filename = f'{SUBSET_DIR}/{dataset_name}_{percentages[i]}percent.csv'
-        write_csv(subset_filename, subset, fieldnames)
+    if GENERATION_MODE == 'legacy':
+        generate_legacy()
+    elif GENERATION_MODE == 'streaming':
+        generate_streaming()
+    elif GENERATION_MODE == 'parallel':
+        generate_streaming(WORKERS)
+    else:
+        generate_vectorized()
@@ -2,8 +2,13 @@ import pandas as pd
 import matplotlib.pyplot as plt
 import re
 import numpy as np
+import scipy.stats as stats
 import seaborn as sns
 import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'Benchmark'))
+import ResultStore
 
 # Imposta lo stile di seaborn per i grafici
 sns.set(style="whitegrid")
@@ -19,16 +24,66 @@ neo4j_csv_paths = [
     "Neo4j/ResponseTimes/neo4j_100_avg_execution.csv",
 ]
 
-# Controlla se i file esistono
-for path in cassandra_csv_path + neo4j_csv_paths:
-    if not os.path.isfile(path):
-        raise FileNotFoundError(f"The file {path} does not exist.")
+# I risultati possono contenere più varianti di schema o modelli del grafo (colonna 'Schema'):
+# i grafici confrontano lo schema originale di Cassandra con il modello originale di Neo4j
+CASSANDRA_SCHEMA = 'filtered'
+NEO4J_SCHEMA = 'property'
+
+# Funzione per estrarre i valori dell'intervallo di confidenza
+def extract_confidence_values(confidence_interval_str):
+    if pd.isna(confidence_interval_str):
+        return np.nan, np.nan
+    matches = re.findall(r'\d+\.\d+', confidence_interval_str)
+    return float(matches[0]), float(matches[1])
 
-# Carica i dati dai file CSV
-data_cassandra_first_execution = pd.read_csv(cassandra_csv_path[0], sep=',')
-data_cassandra_avg_100 = pd.read_csv(cassandra_csv_path[1], sep=',')
-data_neo4j_first_execution = pd.read_csv(neo4j_csv_paths[0], sep=',')
-data_neo4j_avg_100 = pd.read_csv(neo4j_csv_paths[1], sep=',')
+# Funzione per calcolare i dati dei grafici dai campioni grezzi dell'ultima esecuzione salvata in
+# Benchmark/Results: stessi calcoli dei benchmark (media delle esecuzioni a regime e intervallo t
+# al 95%, per Neo4j dopo aver tolto gli outlier), senza rileggere il testo dei CSV
+def load_from_store(backend, schema=''):
+    run_id = ResultStore.latest_run_id(backend)
+    if run_id is None:
+        return None
+    samples = ResultStore.load_run(run_id)
+    samples = samples[samples['schema'] == schema]
+    if samples.empty:
+        return None
+    first_execution, avg_100 = [], []
+    for (dataset, query), group in samples.groupby(['dataset', 'query']):
+        latencies = group.sort_values('iteration')['latency_ms'].to_numpy()
+        measured = ResultStore.steady_samples(group)['latency_ms'].to_numpy()
+        if backend == 'Neo4j' and len(measured) >= 4:
+            q1, q3 = np.percentile(measured, [25, 75])
+            measured = measured[(measured >= q1 - 1.5 * (q3 - q1)) & (measured <= q3 + 1.5 * (q3 - q1))]
+        average = np.mean(measured)
+        ci_min, ci_max = stats.t.interval(0.95, loc=average, scale=stats.sem(measured), df=len(measured) - 1)
+        first_execution.append({'Dataset': dataset, 'Query': query, 'First Execution Time (ms)': latencies[0]})
+        avg_100.append({'Dataset': dataset, 'Query': query, 'Average of 100 Executions (ms)': round(average, 2),
+                        'CI Min': ci_min, 'CI Max': ci_max})
+    print(f"{backend}: using raw samples of run '{run_id}'.")
+    return pd.DataFrame(first_execution), pd.DataFrame(avg_100)
+
+# Funzione per caricare i dati dai file CSV, ricavando gli estremi dell'intervallo di confidenza dal testo
+def load_from_csv(csv_paths, schema=None):
+    for path in csv_paths:
+        if not os.path.isfile(path):
+            raise FileNotFoundError(f"The file {path} does not exist.")
+    first_execution = pd.read_csv(csv_paths[0], sep=',')
+    avg_100 = pd.read_csv(csv_paths[1], sep=',')
+    if schema is not None and 'Schema' in first_execution.columns:
+        first_execution = first_execution[first_execution['Schema'] == schema]
+    if schema is not None and 'Schema' in avg_100.columns:
+        avg_100 = avg_100[avg_100['Schema'] == schema]
+    confidence_values = [extract_confidence_values(value) for value in avg_100['Confidence Interval (Min, Max)']]
+    avg_100 = avg_100.assign(**{'CI Min': [ci[0] for ci in confidence_values], 'CI Max': [ci[1] for ci in confidence_values]})
+    return first_execution, avg_100
+
+# Carica i dati dai campioni grezzi se presenti, altrimenti dai file CSV
+data_cassandra_first_execution, data_cassandra_avg_100 = (
+    load_from_store('Cassandra', CASSANDRA_SCHEMA) or load_from_csv(cassandra_csv_path, CASSANDRA_SCHEMA)
+)
+data_neo4j_first_execution, data_neo4j_avg_100 = (
+    load_from_store('Neo4j', NEO4J_SCHEMA) or load_from_csv(neo4j_csv_paths, NEO4J_SCHEMA)
+)
 
 # Definisci le dimensioni del dataset e le query da analizzare
 dataset_sizes = ['25%', '50%', '75%', '100%']
@@ -38,13 +93,6 @@ queries = ['Query 1', 'Query 2', 'Query 3', 'Query 4']
 color_cassandra = '#2b93db'  # Blu vivace
 color_neo4j = '#4bce4b'     # Lime brillante
 
-# Funzione per estrarre i valori dell'intervallo di confidenza
-def extract_confidence_values(confidence_interval_str):
-    if pd.isna(confidence_interval_str):
-        return np.nan, np.nan
-    matches = re.findall(r'\d+\.\d+', confidence_interval_str)
-    return float(matches[0]), float(matches[1])
-
 # Itera attraverso ogni query per generare i grafici
 for query in queries:
     # Filtra i dati per la query corrente
@@ -120,11 +168,11 @@ for query in queries:
 
     # Estrai gli intervalli di confidenza per Cassandra e Neo4j
     conf_intervals_cassandra = [
-        extract_confidence_values(data_cassandra_query_avg_100[data_cassandra_query_avg_100['Dataset'] == size]['Confidence Interval (Min, Max)'].values[0]) 
+        data_cassandra_query_avg_100[data_cassandra_query_avg_100['Dataset'] == size][['CI Min', 'CI Max']].values[0]
         for size in dataset_sizes
     ]
     conf_intervals_neo4j = [
-        extract_confidence_values(data_neo4j_query_avg_100[data_neo4j_query_avg_100['Dataset'] == size]['Confidence Interval (Min, Max)'].values[0]) 
+        data_neo4j_query_avg_100[data_neo4j_query_avg_100['Dataset'] == size][['CI Min', 'CI Max']].values[0]
         for size in dataset_sizes
     ]
 
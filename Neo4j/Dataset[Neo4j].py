@@ -1,52 +1,228 @@
 import os
+import numpy as np
 import pandas as pd
-from py2neo import Graph, Node, Relationship
+from py2neo import Graph
 from tqdm import tqdm
 
+# Righe inviate in ogni transazione del caricamento (un UNWIND $rows per lotto)
+BATCH_SIZE = 10000
+
+# Modello ad albero temporale, costruito accanto a quello originale: nodi :Year -> :Month -> :Day
+# ((:Year)-[:HAS_MONTH]->(:Month)-[:HAS_DAY]->(:Day)) con ogni visita collegata al suo giorno
+# ((:Visit)-[:ON_DAY]->(:Day)) e la data della visita salvata anche come tipo date in v.visit_date.
+# Le query per intervallo di date partono dai pochi nodi :Day dell'intervallo invece che da tutte le visite
+TIME_TREE = True
+
+# Aggregati materializzati, controparte delle tabelle contatore di Cassandra: un arco
+# (:Doctor)-[:TREATED {visits, first_date, last_date, visit_dates}]->(:Patient) per coppia medico-
+# paziente e nodi (:Doctor|Procedure)-[:HAS_MONTHLY_STATS]->(:MonthlyStats {month: 'AAAA-MM', visits})
+# con le visite di ogni mese. Il carico misto di Query[Neo4j] li aggiorna a ogni nuova visita
+AGGREGATES = True
+
+# Proprietà salvate per ogni etichetta di nodo, nell'ordine delle colonne dei dataset
+node_properties = {
+    'Patient': ['id', 'name', 'birthdate', 'address', 'phone_number', 'email'],
+    'Doctor': ['id', 'name', 'specialization', 'address', 'phone_number', 'email'],
+    'Procedure': ['id', 'description', 'code'],
+    'Visit': ['id', 'date', 'cost', 'duration'],
+}
+visit_columns = ['id', 'date', 'cost', 'cost_cents', 'duration', 'patient_id', 'doctor_id', 'procedure_id']
+
+# Creazione dei nodi a lotti; birthdate resta testo ISO anche se arriva come date (formato 'npy')
+node_statements = {
+    'Patient': "UNWIND $rows AS row CREATE (n:Patient) SET n = row, n.birthdate = toString(row.birthdate)",
+    'Doctor': "UNWIND $rows AS row CREATE (n:Doctor) SET n = row",
+    'Procedure': "UNWIND $rows AS row CREATE (n:Procedure) SET n = row",
+}
+
+# Schema creato prima del caricamento: vincoli di unicità sugli id (con il loro indice, usato per
+# trovare gli estremi delle relazioni) e indici di intervallo sulle proprietà filtrate dalle query
+constraint_statements = [
+    f"CREATE CONSTRAINT {label.lower()}_id_unique IF NOT EXISTS FOR (n:{label}) REQUIRE n.id IS UNIQUE"
+    for label in ['Patient', 'Doctor', 'Procedure', 'Visit']
+]
+range_index_statements = [
+    "CREATE INDEX visit_date IF NOT EXISTS FOR (v:Visit) ON (v.date)",
+    "CREATE INDEX patient_birthdate IF NOT EXISTS FOR (p:Patient) ON (p.birthdate)",
+]
+# Vincoli e indici dell'albero temporale: le chiavi di Year, Month e Day sono NODE KEY, così i MERGE
+# del caricamento e del carico misto trovano il nodo con l'indice del vincolo e client concorrenti
+# non possono creare due volte lo stesso anno, mese o giorno
+time_tree_statements = [
+    "CREATE CONSTRAINT year_node_key IF NOT EXISTS FOR (y:Year) REQUIRE y.year IS NODE KEY",
+    "CREATE CONSTRAINT month_node_key IF NOT EXISTS FOR (m:Month) REQUIRE (m.year, m.month) IS NODE KEY",
+    "CREATE CONSTRAINT day_node_key IF NOT EXISTS FOR (d:Day) REQUIRE d.date IS NODE KEY",
+    "CREATE INDEX visit_visit_date IF NOT EXISTS FOR (v:Visit) ON (v.visit_date)",
+]
+
+def schema_statements():
+    """Vincoli e indici del modello caricato, compresi quelli dell'albero temporale se TIME_TREE."""
+    return constraint_statements + range_index_statements + (time_tree_statements if TIME_TREE else [])
+
+def clear_graph(graph, dataset_name):
+    """
+    Svuota il database prima del caricamento: i nodi vengono creati con CREATE sotto i vincoli di
+    unicità, quindi un nuovo caricamento su un database già popolato (anche dalle visite inserite
+    dal carico misto di Query[Neo4j]) fallirebbe a metà. Cancella a lotti di BATCH_SIZE nodi.
+    """
+    existing = graph.evaluate("MATCH (n) RETURN count(n)")
+    if existing:
+        print(f"{dataset_name} already holds {existing} nodes: deleting them before loading.")
+        graph.run(f"MATCH (n) CALL {{ WITH n DETACH DELETE n }} IN TRANSACTIONS OF {BATCH_SIZE} ROWS")
+
+def provision_schema(graph, dataset_name):
+    """Crea vincoli e indici e attende che siano tutti online prima del caricamento."""
+    for statement in schema_statements():
+        graph.run(statement)
+    graph.run("CALL db.awaitIndexes(300)")
+    print(f"Constraints and indexes online in {dataset_name}.")
+
+# Visite con le tre relazioni nello stesso lotto: ogni relazione viene creata solo se il nodo
+# all'altro estremo esiste, come nel caricamento nodo per nodo. Dal formato 'npy' le date arrivano
+# come valori date e i costi come centesimi interi: il modello originale salva le date come testo
+# ISO (le query le confrontano con stringhe), quindi la conversione avviene lato server
+visit_statement = """
+UNWIND $rows AS row
+CREATE (v:Visit {id: row.id, date: toString(row.date), cost: coalesce(row.cost, row.cost_cents / 100.0), duration: row.duration})
+WITH v, row
+OPTIONAL MATCH (p:Patient {id: row.patient_id})
+FOREACH (_ IN CASE WHEN p IS NULL THEN [] ELSE [1] END | CREATE (v)-[:VISIT_BY]->(p))
+WITH v, row
+OPTIONAL MATCH (d:Doctor {id: row.doctor_id})
+FOREACH (_ IN CASE WHEN d IS NULL THEN [] ELSE [1] END | CREATE (v)-[:VISIT_TO]->(d))
+WITH v, row
+OPTIONAL MATCH (proc:Procedure {id: row.procedure_id})
+FOREACH (_ IN CASE WHEN proc IS NULL THEN [] ELSE [1] END | CREATE (v)-[:INCLUDES_PROCEDURE]->(proc))
+"""
+# Aggiunto a visit_statement con TIME_TREE: i nodi :Day sono già stati creati da create_time_tree
+visit_time_tree_clause = """
+WITH v, row
+SET v.visit_date = date(row.date)
+WITH v
+MATCH (day:Day {date: v.visit_date})
+CREATE (v)-[:ON_DAY]->(day)
+"""
+
+# Nodi dell'albero temporale, dal più alto al più basso: ogni livello si aggancia al precedente
+time_tree_node_statements = [
+    ('Year', "UNWIND $rows AS row MERGE (:Year {year: row.year})", ['year']),
+    ('Month', """
+UNWIND $rows AS row
+MATCH (y:Year {year: row.year})
+MERGE (m:Month {year: row.year, month: row.month})
+MERGE (y)-[:HAS_MONTH]->(m)
+""", ['year', 'month']),
+    ('Day', """
+UNWIND $rows AS row
+MATCH (m:Month {year: row.year, month: row.month})
+MERGE (d:Day {date: date(row.date)})
+MERGE (m)-[:HAS_DAY]->(d)
+""", ['year', 'month', 'date']),
+]
+
+def time_tree_frames(visits):
+    """
+    Anni, mesi e giorni presenti nelle date delle visite, con id interi AAAA, AAAAMM e AAAAMMGG
+    (usati come id dei nodi nell'importazione offline).
+    """
+    dates = pd.Series(pd.to_datetime(visits['date'].unique())).sort_values()
+    days = pd.DataFrame({
+        'id': (dates.dt.year * 10000 + dates.dt.month * 100 + dates.dt.day).to_numpy(),
+        'year': dates.dt.year.to_numpy(),
+        'month': dates.dt.month.to_numpy(),
+        'date': dates.dt.strftime('%Y-%m-%d').to_numpy(),
+    })
+    months = days[['year', 'month']].drop_duplicates().assign(id=lambda frame: frame['year'] * 100 + frame['month'])
+    years = months[['year']].drop_duplicates()
+    return {'Year': years, 'Month': months, 'Day': days}
+
+# Archi e nodi aggregati, creati dopo le visite a partire dagli stessi dati
+treated_statement = """
+UNWIND $rows AS row
+MATCH (d:Doctor {id: row.doctor_id}), (p:Patient {id: row.patient_id})
+CREATE (d)-[:TREATED {visits: row.visits, first_date: row.first_date, last_date: row.last_date, visit_dates: row.visit_dates}]->(p)
+"""
+monthly_stats_statement = """
+UNWIND $rows AS row
+MATCH (n:{label} {{id: row.id}})
+CREATE (n)-[:HAS_MONTHLY_STATS]->(:MonthlyStats {{month: row.month, visits: row.visits}})
+"""
+
+def iso_dates(values):
+    """Date come testo 'AAAA-MM-GG', sia da colonne datetime64 (formato 'npy') sia dal testo dei CSV."""
+    if pd.api.types.is_datetime64_any_dtype(values):
+        return values.dt.strftime('%Y-%m-%d')
+    return values
+
+def aggregate_frames(visits):
+    """
+    Aggregati delle visite: per coppia medico-paziente numero di visite, prima e ultima data e
+    date ordinate; per medico e per procedura il numero di visite di ogni mese ('AAAA-MM').
+    """
+    by_date = visits.sort_values('date', kind='stable')
+    # Le date degli archi sono testo ISO come v.date, confrontato con stringhe dalle query
+    dates = iso_dates(by_date['date'])
+    treated = dates.groupby([by_date['doctor_id'], by_date['patient_id']]).agg(
+        visits='size', first_date='min', last_date='max', visit_dates=list).reset_index()
+    months = dates.str[:7]
+    monthly = {
+        label: by_date.groupby([by_date[column].rename('id'), months.rename('month')]).size().rename('visits').reset_index()
+        for label, column in (('Doctor', 'doctor_id'), ('Procedure', 'procedure_id'))
+    }
+    return treated, monthly
+
+def create_aggregates(graph, visits, dataset_name):
+    treated, monthly = aggregate_frames(visits)
+    run_batches(graph, treated_statement, treated, list(treated.columns), f"Loading TREATED edges into {dataset_name}")
+    for label, frame in monthly.items():
+        run_batches(graph, monthly_stats_statement.format(label=label), frame, ['id', 'month', 'visits'],
+                    f"Loading {label} monthly stats into {dataset_name}")
+
+def create_time_tree(graph, visits, dataset_name):
+    tree = time_tree_frames(visits)
+    for label, statement, columns in time_tree_node_statements:
+        run_batches(graph, statement, tree[label], columns, f"Loading {label} nodes into {dataset_name}")
+
+def batch_rows(frame, columns):
+    """
+    Lotti di al più BATCH_SIZE righe come liste di dizionari con tipi Python (NaN diventa null).
+    Le colonne assenti dal frame vengono saltate; quelle datetime64 diventano valori date di Neo4j.
+    """
+    columns = [column for column in columns if column in frame]
+    for start in range(0, len(frame), BATCH_SIZE):
+        batch = frame.iloc[start:start + BATCH_SIZE][columns]
+        batch = batch.assign(**{
+            column: batch[column].dt.date for column in columns if pd.api.types.is_datetime64_any_dtype(batch[column])
+        }).astype(object)
+        yield batch.where(batch.notna(), None).to_dict('records')
+
+def run_batches(graph, statement, frame, columns, desc):
+    """Esegue lo statement una volta per lotto, ognuno in una propria transazione."""
+    with tqdm(total=len(frame), desc=desc) as progress:
+        for rows in batch_rows(frame, columns):
+            graph.run(statement, rows=rows)
+            progress.update(len(rows))
+
 # Funzione per creare nodi e relazioni nel grafo Neo4j a partire dai dataset forniti
 def create_graph(graph, patients, doctors, procedures, visits, dataset_name):
     print(f"Starting to load data into {dataset_name}...")
 
-    # Crea nodi per i pazienti
-    patient_nodes = {}
-    for _, row in tqdm(patients.iterrows(), total=len(patients), desc=f"Loading Patients into {dataset_name}"):
-        patient_node = Node("Patient", id=row['id'], name=row['name'], birthdate=row['birthdate'], address=row['address'], phone_number=row['phone_number'], email=row['email'])
-        graph.create(patient_node)
-        patient_nodes[row['id']] = patient_node
-
-    # Crea nodi per i dottori
-    doctor_nodes = {}
-    for _, row in tqdm(doctors.iterrows(), total=len(doctors), desc=f"Loading Doctors into {dataset_name}"):
-        doctor_node = Node("Doctor", id=row['id'], name=row['name'], specialization=row['specialization'], address=row['address'], phone_number=row['phone_number'], email=row['email'])
-        graph.create(doctor_node)
-        doctor_nodes[row['id']] = doctor_node
-
-    # Crea nodi per le procedure mediche
-    procedure_nodes = {}
-    for _, row in tqdm(procedures.iterrows(), total=len(procedures), desc=f"Loading Procedures into {dataset_name}"):
-        procedure_node = Node("Procedure", id=row['id'], description=row['description'], code=row['code'])
-        graph.create(procedure_node)
-        procedure_nodes[row['id']] = procedure_node
-
-    # Crea nodi per le visite e relazioni
-    for _, row in tqdm(visits.iterrows(), total=len(visits), desc=f"Loading Visits and Relationships into {dataset_name}"):
-        visit_node = Node("Visit", id=row['id'], date=row['date'], cost=row['cost'], duration=row['duration'])
-        graph.create(visit_node)
-
-        # Relazione tra visita e paziente
-        if row['patient_id'] in patient_nodes:
-            rel_patient = Relationship(visit_node, "VISIT_BY", patient_nodes[row['patient_id']])
-            graph.create(rel_patient)
-
-        # Relazione tra visita e dottore
-        if row['doctor_id'] in doctor_nodes:
-            rel_doctor = Relationship(visit_node, "VISIT_TO", doctor_nodes[row['doctor_id']])
-            graph.create(rel_doctor)
-
-        # Relazione tra visita e procedura
-        if row['procedure_id'] in procedure_nodes:
-            rel_procedure = Relationship(visit_node, "INCLUDES_PROCEDURE", procedure_nodes[row['procedure_id']])
-            graph.create(rel_procedure)
+    clear_graph(graph, dataset_name)
+    provision_schema(graph, dataset_name)
+
+    # Crea i nodi per pazienti, dottori e procedure mediche
+    for label, frame in (('Patient', patients), ('Doctor', doctors), ('Procedure', procedures)):
+        run_batches(graph, node_statements[label], frame, node_properties[label], f"Loading {label} nodes into {dataset_name}")
+
+    # Crea nodi per le visite e relazioni, collegando ogni visita al suo giorno con TIME_TREE
+    statement = visit_statement
+    if TIME_TREE:
+        create_time_tree(graph, visits, dataset_name)
+        statement += visit_time_tree_clause
+    run_batches(graph, statement, visits, visit_columns, f"Loading Visits and Relationships into {dataset_name}")
+
+    if AGGREGATES:
+        create_aggregates(graph, visits, dataset_name)
 
     print(f"Finished loading data into {dataset_name}.")
 
@@ -56,35 +232,184 @@ def load_data_from_csv(dataset_path):
 
 # Percorso della cartella Subsets
 SUBSET_DIR = 'Dataset/Subsets'
+SUBSET_INDEX_FILE = f'{SUBSET_DIR}/subset_index.csv'
+
+NPY_DIR = f'{SUBSET_DIR}/npy'
+
+# Funzione per leggere dall'indice il numero di righe di un sottoinsieme (lunghezza del prefisso)
+def subset_rows(table_name, subset_percentage):
+    index = pd.read_csv(SUBSET_INDEX_FILE)
+    return index.loc[(index['table'] == table_name) & (index['percentage'] == subset_percentage), 'rows'].item()
+
+# Funzione per caricare una tabella in disposizione 'tiered' (un solo file ordinato per tier):
+# il sottoinsieme è il prefisso di lunghezza indicata nell'indice
+def load_tiered_table(table_name, subset_percentage):
+    rows = subset_rows(table_name, subset_percentage)
+    table = pd.read_csv(f'{SUBSET_DIR}/{table_name}.csv', encoding='ISO-8859-1', nrows=rows)
+    return table.drop(columns=['tier'])
+
+# Funzione per caricare una tabella in formato 'npy' mappando in memoria i file delle colonne:
+# le colonne intere e le date (datetime64) sono viste sui file, i costi restano interi in
+# centesimi nella colonna 'cost_cents'; solo i testi diventano stringhe Python
+def load_npy_table(table_name, subset_percentage):
+    table_dir = f'{NPY_DIR}/{table_name}'
+    rows = subset_rows(table_name, subset_percentage)
+    schema = pd.read_csv(f'{table_dir}/schema.csv')
+    columns = {}
+    for column, column_type in zip(schema['column'], schema['type']):
+        if column_type == 'text':
+            offsets = np.load(f'{table_dir}/{column}.offsets.npy', mmap_mode='r')[:rows + 1].tolist()
+            data = np.load(f'{table_dir}/{column}.data.npy', mmap_mode='r')[:offsets[-1]].tobytes()
+            columns[column] = [data[start:end].decode('utf-8') for start, end in zip(offsets[:-1], offsets[1:])]
+        else:
+            values = np.load(f'{table_dir}/{column}.npy', mmap_mode='r')[:rows]
+            columns[f'{column}_cents' if column_type == 'cents' else column] = values
+    return pd.DataFrame(columns, copy=False)
+
+# Modalità di caricamento: 'cypher' crea i grafi nei database in esecuzione con gli statement
+# UNWIND a lotti; 'admin_import' scrive invece in IMPORT_DIR/dataset{p} i file CSV per
+# l'importazione offline con neo4j-admin (eseguita da Utility/Admin-Import.py)
+LOAD_MODE = 'cypher'
+IMPORT_DIR = 'Neo4j/Import'
 
-# Connessione ai diversi database Neo4j
-graph100 = Graph("bolt://localhost:7687", user="neo4j", password="12345678", name="dataset100")
-graph75 = Graph("bolt://localhost:7687", user="neo4j", password="12345678", name="dataset75")
-graph50 = Graph("bolt://localhost:7687", user="neo4j", password="12345678", name="dataset50")
-graph25 = Graph("bolt://localhost:7687", user="neo4j", password="12345678", name="dataset25")
+# Funzione per caricare le quattro tabelle di un sottoinsieme, nella disposizione presente in SUBSET_DIR
+def load_subset_tables(subset_percentage):
+    if os.path.exists(SUBSET_INDEX_FILE):
+        load_table = load_npy_table if os.path.isdir(NPY_DIR) else load_tiered_table
+        return tuple(
+            load_table(table_name, subset_percentage)
+            for table_name in ('patients', 'doctors', 'procedures', 'visits')
+        )
+
+    # Carica i dati dai file CSV basati sulla percentuale
+    return tuple(
+        load_data_from_csv(f'{SUBSET_DIR}/{table_name}_{subset_percentage}percent.csv')
+        for table_name in ('patients', 'doctors', 'procedures', 'visits')
+    )
+
+# Intestazioni dei file di neo4j-admin import: l'id di ogni etichetta è in un proprio gruppo di
+# id, memorizzato anche come proprietà 'id' (intera con --id-type=INTEGER); le proprietà senza
+# tipo sono stringhe, come nel caricamento con Cypher
+import_node_headers = {
+    'Patient': {'id': 'id:ID(Patient)'},
+    'Doctor': {'id': 'id:ID(Doctor)'},
+    'Procedure': {'id': 'id:ID(Procedure)'},
+    'Visit': {'id': 'id:ID(Visit)', 'cost': 'cost:float', 'duration': 'duration:int', 'visit_date': 'visit_date:date'},
+    'Year': {'year': 'year:ID(Year)'},
+    'Month': {'id': ':ID(Month)', 'year': 'year:int', 'month': 'month:int'},
+    'Day': {'id': ':ID(Day)', 'date': 'date:date'},
+    'MonthlyStats': {'stats_id': ':ID(MonthlyStats)', 'month': 'month', 'visits': 'visits:int'},
+}
+# Relazioni delle visite: tipo, colonna con l'id dell'altro estremo ed etichetta di quel nodo
+import_relationships = [
+    ('VISIT_BY', 'patient_id', 'Patient'),
+    ('VISIT_TO', 'doctor_id', 'Doctor'),
+    ('INCLUDES_PROCEDURE', 'procedure_id', 'Procedure'),
+]
+
+def write_relationships(import_dir, relationship_type, start_label, start_ids, end_label, end_ids,
+                        properties=None, file_name=None):
+    """File di relazioni (per default {tipo}.csv); properties associa le intestazioni tipizzate ai valori."""
+    pd.DataFrame({
+        f':START_ID({start_label})': np.asarray(start_ids),
+        f':END_ID({end_label})': np.asarray(end_ids),
+        ':TYPE': relationship_type,
+        **{header: np.asarray(values) for header, values in (properties or {}).items()},
+    }).to_csv(f'{import_dir}/{file_name or relationship_type}.csv', index=False)
+
+def write_import_files(patients, doctors, procedures, visits, dataset_name):
+    """
+    Scrive i file di nodi e relazioni per neo4j-admin import, uno per etichetta e uno per tipo di
+    relazione, più schema.cypher con vincoli e indici da creare dopo l'importazione. Le relazioni
+    verso nodi inesistenti vengono scartate, come nel caricamento con Cypher.
+    """
+    import_dir = f'{IMPORT_DIR}/{dataset_name}'
+    os.makedirs(import_dir, exist_ok=True)
+    if 'cost_cents' in visits:
+        visits = visits.assign(cost=visits['cost_cents'] / 100)
+    node_frames = {'Patient': patients, 'Doctor': doctors, 'Procedure': procedures, 'Visit': visits}
+    node_columns = dict(node_properties)
+    if TIME_TREE:
+        node_frames['Visit'] = visits.assign(visit_date=visits['date'])
+        node_columns['Visit'] = node_properties['Visit'] + ['visit_date']
+        tree = time_tree_frames(visits)
+        node_frames.update(tree)
+        node_columns.update({label: list(import_node_headers[label]) for label in tree})
+    for label, frame in node_frames.items():
+        frame[node_columns[label]].rename(columns=import_node_headers[label]).to_csv(f'{import_dir}/{label}.csv', index=False)
+        print(f"Import file '{import_dir}/{label}.csv' created with {len(frame)} nodes.")
+
+    for relationship_type, column, label in import_relationships:
+        linked = visits[visits[column].isin(node_frames[label]['id'])]
+        write_relationships(import_dir, relationship_type, 'Visit', linked['id'], label, linked[column])
+        print(f"Import file '{import_dir}/{relationship_type}.csv' created with {len(linked)} relationships "
+              f"({len(visits) - len(linked)} dangling skipped).")
+
+    if TIME_TREE:
+        months, days = tree['Month'], tree['Day']
+        visit_dates = pd.to_datetime(visits['date'])
+        write_relationships(import_dir, 'HAS_MONTH', 'Year', months['year'], 'Month', months['id'])
+        write_relationships(import_dir, 'HAS_DAY', 'Month', days['year'] * 100 + days['month'], 'Day', days['id'])
+        write_relationships(import_dir, 'ON_DAY', 'Visit', visits['id'], 'Day',
+                            visit_dates.dt.year * 10000 + visit_dates.dt.month * 100 + visit_dates.dt.day)
+        print(f"Time tree import files created in '{import_dir}' ({len(tree['Year'])} years, {len(months)} months, {len(days)} days).")
+    else:
+        # File dell'albero temporale di un'esportazione precedente: Admin-Import li importerebbe
+        for name in ('Year', 'Month', 'Day', 'HAS_MONTH', 'HAS_DAY', 'ON_DAY'):
+            if os.path.exists(f'{import_dir}/{name}.csv'):
+                os.remove(f'{import_dir}/{name}.csv')
+
+    if AGGREGATES:
+        treated, monthly = aggregate_frames(visits)
+        treated = treated[treated['doctor_id'].isin(doctors['id']) & treated['patient_id'].isin(patients['id'])]
+        write_relationships(import_dir, 'TREATED', 'Doctor', treated['doctor_id'], 'Patient', treated['patient_id'], {
+            'visits:int': treated['visits'],
+            'first_date': treated['first_date'],
+            'last_date': treated['last_date'],
+            'visit_dates:string[]': treated['visit_dates'].str.join(';'),  # ';' è il separatore predefinito degli array
+        })
+        # Un solo file di nodi :MonthlyStats, con id progressivi, e un file di archi per etichetta
+        stats = pd.concat([frame[frame['id'].isin(node_frames[label]['id'])].assign(label=label)
+                           for label, frame in monthly.items()], ignore_index=True)
+        stats['stats_id'] = np.arange(len(stats))
+        stats[list(import_node_headers['MonthlyStats'])].rename(columns=import_node_headers['MonthlyStats']).to_csv(
+            f'{import_dir}/MonthlyStats.csv', index=False)
+        for label, label_stats in stats.groupby('label'):
+            write_relationships(import_dir, 'HAS_MONTHLY_STATS', label, label_stats['id'], 'MonthlyStats', label_stats['stats_id'],
+                                file_name=f'{label}_HAS_MONTHLY_STATS')
+        print(f"Aggregate import files created in '{import_dir}' ({len(treated)} TREATED edges, {len(stats)} monthly stats).")
+    else:
+        for name in ('TREATED', 'MonthlyStats', 'Doctor_HAS_MONTHLY_STATS', 'Procedure_HAS_MONTHLY_STATS'):
+            if os.path.exists(f'{import_dir}/{name}.csv'):
+                os.remove(f'{import_dir}/{name}.csv')
+
+    with open(f'{import_dir}/schema.cypher', 'w') as schema_file:
+        schema_file.write(';\n'.join(schema_statements()) + ';\n')
 
 # Funzione per caricare i dati per ciascun sottoinsieme e categoria
 def load_and_create_graph_for_subset(subset_percentage, graph):
-    # Definisci i nomi dei file CSV basati sulla percentuale
-    patients_file = f'{SUBSET_DIR}/patients_{subset_percentage}percent.csv'
-    doctors_file = f'{SUBSET_DIR}/doctors_{subset_percentage}percent.csv'
-    procedures_file = f'{SUBSET_DIR}/procedures_{subset_percentage}percent.csv'
-    visits_file = f'{SUBSET_DIR}/visits_{subset_percentage}percent.csv'
-
-    # Carica i dati dai file CSV
-    patients = load_data_from_csv(patients_file)
-    doctors = load_data_from_csv(doctors_file)
-    procedures = load_data_from_csv(procedures_file)
-    visits = load_data_from_csv(visits_file)
+    patients, doctors, procedures, visits = load_subset_tables(subset_percentage)
 
     # Crea i nodi e le relazioni nel grafo
     create_graph(graph, patients, doctors, procedures, visits, f"dataset{subset_percentage}")
 
-# Carica i dati e crea i grafi per i vari sottoinsiemi
-load_and_create_graph_for_subset(100, graph100)
-load_and_create_graph_for_subset(75, graph75)
-load_and_create_graph_for_subset(50, graph50)
-load_and_create_graph_for_subset(25, graph25)
+if LOAD_MODE == 'admin_import':
+    # Scrive i file di importazione per i vari sottoinsiemi, senza connettersi a Neo4j
+    for subset_percentage in (100, 75, 50, 25):
+        write_import_files(*load_subset_tables(subset_percentage), f"dataset{subset_percentage}")
+    print(f"Import files written to {IMPORT_DIR}; run Neo4j/Utility/Admin-Import.py to build the databases.")
+else:
+    # Connessione ai diversi database Neo4j
+    graph100 = Graph("bolt://localhost:7687", user="neo4j", password="12345678", name="dataset100")
+    graph75 = Graph("bolt://localhost:7687", user="neo4j", password="12345678", name="dataset75")
+    graph50 = Graph("bolt://localhost:7687", user="neo4j", password="12345678", name="dataset50")
+    graph25 = Graph("bolt://localhost:7687", user="neo4j", password="12345678", name="dataset25")
+
+    # Carica i dati e crea i grafi per i vari sottoinsiemi
+    load_and_create_graph_for_subset(100, graph100)
+    load_and_create_graph_for_subset(75, graph75)
+    load_and_create_graph_for_subset(50, graph50)
+    load_and_create_graph_for_subset(25, graph25)
 
-# Stampa un messaggio di conferma
-print("Data successfully loaded into all Neo4j databases.")
+    # Stampa un messaggio di conferma
+    print("Data successfully loaded into all Neo4j databases.")
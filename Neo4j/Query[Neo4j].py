@@ -1,10 +1,20 @@
 from neo4j import GraphDatabase
+from datetime import date, timedelta
+from functools import partial
+import itertools
+import random
 import time
 import csv
 import numpy as np
 import os
 import scipy.stats as stats
 import logging
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'Benchmark'))
+import AdaptiveRunner
+import LoadGenerator
+import ResultStore
 
 # Configurazione logging
 logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(message)s")
@@ -20,12 +30,179 @@ database_mappings = {
     "25%": "dataset25"
 }
 
+# Ripetizioni adattive (AdaptiveRunner): riscaldamento rilevato e campionamento fino all'intervallo
+# di confidenza desiderato o all'esaurimento del tempo. Con False si usano 10 esecuzioni di
+# riscaldamento e 101 esecuzioni fisse
+ADAPTIVE_REPETITIONS = True
+# Modalità strumentata: le query vengono eseguite con PROFILE e per ogni esecuzione si salvano
+# db hits, righe e albero degli operatori accanto al campione. PROFILE aggiunge lavoro lato
+# server, quindi le latenze misurate così non vanno confrontate con quelle normali
+INSTRUMENT = False
+
+# Modelli del grafo misurati uno dopo l'altro sullo stesso database: 'property' (le query filtrano
+# la stringa v.date di tutte le visite), 'time_tree' (le query partono dai nodi :Year/:Day
+# dell'intervallo, creati da Dataset[Neo4j] con TIME_TREE = True) e 'aggregates' (archi :TREATED
+# e nodi :MonthlyStats, creati con AGGREGATES = True)
+GRAPH_MODELS = ['property', 'time_tree', 'aggregates']
+
+# Confronto dei modelli al variare dell'ampiezza dell'intervallo di date: per ogni ampiezza (in
+# giorni, con fine RANGE_END_DATE) la query di intervallo viene eseguita SWEEP_REPETITIONS volte
+RANGE_WIDTH_SWEEP = True
+RANGE_END_DATE = date(2023, 12, 31)
+RANGE_WIDTHS = [1, 7, 30, 90, 365, 1095]
+SWEEP_REPETITIONS = 10
+
+# Test di carico con più client concorrenti (LoadGenerator.CLIENT_COUNTS) al posto delle misure singole
+LOAD_TEST = False
+# Carico misto: letture a frequenza fissa con un flusso concorrente di nuove visite
+# (LoadGenerator.OPEN_LOOP_*). Le visite inserite restano nei database: ricaricarli dopo il test con
+# Dataset[Neo4j], che li svuota prima di creare di nuovo i nodi
+MIXED_WORKLOAD = False
+# Intervallo delle date delle visite inserite, dentro quello letto dalle Query 1-3, e numero
+# massimo di pazienti letti dal database tra cui scegliere
+INGEST_START_DATE = date(2021, 1, 1)
+INGEST_END_DATE = date.today()
+INGEST_PATIENTS = 10000
+
+# Nuova visita collegata a paziente, medico e procedura esistenti, come in Dataset[Neo4j]
+ingest_query = """
+MATCH (p:Patient {id: $patient_id}), (d:Doctor {id: $doctor_id}), (proc:Procedure {id: $procedure_id})
+CREATE (v:Visit {id: $id, date: $date, cost: $cost, duration: $duration})
+CREATE (v)-[:VISIT_BY]->(p), (v)-[:VISIT_TO]->(d), (v)-[:INCLUDES_PROCEDURE]->(proc)
+"""
+# Aggiunto a ingest_query se si misura anche 'aggregates': aggiorna l'arco TREATED della coppia
+# medico-paziente e le statistiche del mese di medico e procedura, come le tabelle contatore di Cassandra
+ingest_aggregates_clause = """
+WITH v, p, d, proc
+MERGE (d)-[t:TREATED]->(p)
+  ON CREATE SET t.visits = 1, t.first_date = $date, t.last_date = $date, t.visit_dates = [$date]
+  ON MATCH SET t.visits = t.visits + 1,
+               t.first_date = CASE WHEN $date < t.first_date THEN $date ELSE t.first_date END,
+               t.last_date = CASE WHEN $date > t.last_date THEN $date ELSE t.last_date END,
+               t.visit_dates = t.visit_dates + $date
+MERGE (d)-[:HAS_MONTHLY_STATS]->(doctor_stats:MonthlyStats {month: left($date, 7)})
+  ON CREATE SET doctor_stats.visits = 1
+  ON MATCH SET doctor_stats.visits = doctor_stats.visits + 1
+MERGE (proc)-[:HAS_MONTHLY_STATS]->(procedure_stats:MonthlyStats {month: left($date, 7)})
+  ON CREATE SET procedure_stats.visits = 1
+  ON MATCH SET procedure_stats.visits = procedure_stats.visits + 1
+"""
+# Aggiunto a ingest_query se si misura anche 'time_tree': la visita viene collegata al suo giorno,
+# creando i nodi dell'albero temporale che mancano
+ingest_time_tree_clause = """
+WITH v
+SET v.visit_date = date($date)
+MERGE (y:Year {year: v.visit_date.year})
+MERGE (m:Month {year: v.visit_date.year, month: v.visit_date.month})
+MERGE (y)-[:HAS_MONTH]->(m)
+MERGE (day:Day {date: v.visit_date})
+MERGE (m)-[:HAS_DAY]->(day)
+CREATE (v)-[:ON_DAY]->(day)
+"""
+
+queries = {
+    'Query 1': """
+    MATCH (d:Doctor)-[:VISIT_TO]-(v:Visit)
+    WHERE v.date >= '2021-01-01' AND rand() < 1
+    WITH d, d.specialization AS specialization, COUNT(v) AS total_visits
+    RETURN d.id AS doctor_id, specialization, total_visits
+    """,
+    'Query 2': """ 
+    MATCH (v:Visit)-[:INCLUDES_PROCEDURE]-(proc:Procedure)
+    WHERE v.date >= '2021-01-01' AND v.date <= '2023-12-31' AND rand() < 1
+    WITH proc, proc.description AS description, COUNT(v) AS total_procedures
+    RETURN proc.id AS procedure_id, description, total_procedures
+    """,
+    'Query 3': """
+    MATCH (d:Doctor)-[:VISIT_TO]-(v:Visit)-[:VISIT_BY]-(p:Patient)
+    WHERE v.date >= '2021-01-01' AND v.date <= '2023-12-31' AND rand() < 1
+    WITH d, COUNT(DISTINCT p) AS total_patients
+    RETURN d.id AS doctor_id, total_patients
+    """,
+    'Query 4': """
+    MATCH (p:Patient)
+    WHERE p.birthdate >= '1940-06-21' AND rand() < 1
+    RETURN p
+    """
+}
+
+# Query 1-3 sul modello ad albero temporale: gli intervalli coprono anni interi, quindi si parte
+# dai nodi :Year dell'intervallo e si scende a mesi, giorni e visite
+time_tree_queries = {
+    'Query 1': """
+    MATCH (y:Year)-[:HAS_MONTH]->(:Month)-[:HAS_DAY]->(:Day)<-[:ON_DAY]-(v:Visit)-[:VISIT_TO]-(d:Doctor)
+    WHERE y.year >= 2021 AND rand() < 1
+    WITH d, d.specialization AS specialization, COUNT(v) AS total_visits
+    RETURN d.id AS doctor_id, specialization, total_visits
+    """,
+    'Query 2': """
+    MATCH (y:Year)-[:HAS_MONTH]->(:Month)-[:HAS_DAY]->(:Day)<-[:ON_DAY]-(v:Visit)-[:INCLUDES_PROCEDURE]-(proc:Procedure)
+    WHERE y.year >= 2021 AND y.year <= 2023 AND rand() < 1
+    WITH proc, proc.description AS description, COUNT(v) AS total_procedures
+    RETURN proc.id AS procedure_id, description, total_procedures
+    """,
+    'Query 3': """
+    MATCH (y:Year)-[:HAS_MONTH]->(:Month)-[:HAS_DAY]->(:Day)<-[:ON_DAY]-(v:Visit)-[:VISIT_BY]-(p:Patient),
+          (v)-[:VISIT_TO]-(d:Doctor)
+    WHERE y.year >= 2021 AND y.year <= 2023 AND rand() < 1
+    WITH d, COUNT(DISTINCT p) AS total_patients
+    RETURN d.id AS doctor_id, total_patients
+    """,
+}
+
+# Query 1-3 sugli aggregati materializzati: le visite per medico e per procedura sono somme
+# delle statistiche mensili (gli intervalli coprono mesi interi), i pazienti per medico sono gli
+# archi TREATED con almeno una visita nell'intervallo, senza COUNT(DISTINCT) sui percorsi
+aggregate_queries = {
+    'Query 1': """
+    MATCH (d:Doctor)-[:HAS_MONTHLY_STATS]->(s:MonthlyStats)
+    WHERE s.month >= '2021-01' AND rand() < 1
+    WITH d, d.specialization AS specialization, SUM(s.visits) AS total_visits
+    RETURN d.id AS doctor_id, specialization, total_visits
+    """,
+    'Query 2': """
+    MATCH (proc:Procedure)-[:HAS_MONTHLY_STATS]->(s:MonthlyStats)
+    WHERE s.month >= '2021-01' AND s.month <= '2023-12' AND rand() < 1
+    WITH proc, proc.description AS description, SUM(s.visits) AS total_procedures
+    RETURN proc.id AS procedure_id, description, total_procedures
+    """,
+    'Query 3': """
+    MATCH (d:Doctor)-[t:TREATED]->(p:Patient)
+    WHERE t.last_date >= '2021-01-01' AND t.first_date <= '2023-12-31'
+      AND any(visit_date IN t.visit_dates WHERE visit_date >= '2021-01-01' AND visit_date <= '2023-12-31')
+      AND rand() < 1
+    WITH d, COUNT(p) AS total_patients
+    RETURN d.id AS doctor_id, total_patients
+    """,
+}
+
+queries_by_model = {'property': queries, 'time_tree': time_tree_queries, 'aggregates': aggregate_queries}
+
+# Query di intervallo usata da sweep_range_widths: visite con procedura tra $start e $end. Sul
+# modello ad albero l'intervallo arbitrario viene cercato sui nodi :Day (indice su d.date). Gli
+# aggregati hanno granularità mensile e non rispondono a intervalli arbitrari: restano fuori
+range_queries = {
+    'property': """
+    MATCH (v:Visit)-[:INCLUDES_PROCEDURE]-(proc:Procedure)
+    WHERE v.date >= $start AND v.date <= $end
+    RETURN COUNT(v) AS visits
+    """,
+    'time_tree': """
+    MATCH (day:Day)
+    WHERE day.date >= date($start) AND day.date <= date($end)
+    MATCH (day)<-[:ON_DAY]-(v:Visit)-[:INCLUDES_PROCEDURE]-(proc:Procedure)
+    RETURN COUNT(v) AS visits
+    """,
+}
+
 class Neo4jConnection:
-    def __init__(self, uri, user, password, database_name):
+    def __init__(self, uri, user, password, database_name, instrument=False):
         self._uri = uri
         self._user = user
         self._password = password
         self._database_name = database_name
+        self.instrument = instrument
+        self.last_profile = None
         try:
             self._driver = GraphDatabase.driver(self._uri, auth=(self._user, self._password))
             logging.info(f"Connesso a Neo4j database: {database_name}")
@@ -39,21 +216,68 @@ class Neo4jConnection:
             logging.info(f"Connessione al database chiusa: {self._database_name}")
 
     def execute_query(self, query, parameters=None):
+        self.last_profile = None
         try:
             with self._driver.session(database=self._database_name) as session:
+                if self.instrument:
+                    result = session.run("PROFILE " + query, parameters)
+                    records = [record for record in result]
+                    self.last_profile = profile_summary(result.consume().profile)
+                    return records
                 result = session.run(query, parameters)
                 return [record for record in result]
         except Exception as e:
+            # Una query fallita non deve diventare un risultato vuoto misurato come valido
             logging.error(f"Errore durante l'esecuzione della query: {query}\nErrore: {e}")
-            return []
+            raise
 
     def clear_cache(self):
         try:
-            self.execute_query("CALL db.clearQueryCaches()")
+            run_query(self, "CALL db.clearQueryCaches()")  # Mai con PROFILE
             logging.info(f"Cache svuotata per il database: {self._database_name}")
         except Exception as e:
             logging.error(f"Errore durante la pulizia della cache: {e}")
 
+def operator_tree(plan):
+    """Albero degli operatori di un piano PROFILE con db hits, righe e dettagli di ogni operatore."""
+    return {
+        'operator': plan.get('operatorType'),
+        'db_hits': plan.get('dbHits', 0),
+        'rows': plan.get('rows', 0),
+        'details': plan.get('args', {}).get('Details', ''),
+        'children': [operator_tree(child) for child in plan.get('children', [])],
+    }
+
+def profile_summary(plan):
+    """Profilo di un'esecuzione: db hits totali, righe restituite e albero degli operatori."""
+    if not plan:
+        return None
+    tree = operator_tree(plan)
+
+    def total_db_hits(node):
+        return node['db_hits'] + sum(total_db_hits(child) for child in node['children'])
+
+    return {'db_hits': total_db_hits(tree), 'rows': tree['rows'], 'operators': tree}
+
+def index_operators(db, query):
+    """
+    Operatori del piano della query (EXPLAIN, senza eseguirla) che leggono da un indice, es.
+    NodeIndexSeekByRange: una lista vuota indica un piano basato solo su scansioni per etichetta.
+    """
+    plan = run_query_summary(db, "EXPLAIN " + query).plan
+    operators = []
+
+    def collect(node):
+        operator = node.get('operatorType', '').split('@')[0]
+        if 'Index' in operator:
+            operators.append(operator)
+        for child in node.get('children', []):
+            collect(child)
+
+    if plan:
+        collect(plan)
+    return operators
+
 def measure_query_time(db, query, warmup=0):
     # Warm-up più lungo
     for _ in range(warmup):
@@ -65,6 +289,60 @@ def measure_query_time(db, query, warmup=0):
     end_time = time.perf_counter()
     return (end_time - start_time) * 1000  # Conversione in millisecondi
 
+def run_query(db, query, parameters=None):
+    """Come Neo4jConnection.execute_query, ma senza PROFILE né log degli errori (li conta il test di carico)."""
+    with db._driver.session(database=db._database_name) as session:
+        return [record for record in session.run(query, parameters)]
+
+def run_query_summary(db, query, parameters=None):
+    """Esegue la query e restituisce il riepilogo del risultato (piano, profilo, contatori)."""
+    with db._driver.session(database=db._database_name) as session:
+        return session.run(query, parameters).consume()
+
+def build_visit_ingest(db):
+    """
+    Restituisce una funzione che crea una nuova visita con le sue tre relazioni: paziente,
+    medico, procedura e data sono scelti a caso tra quelli del database, gli id proseguono
+    dal massimo esistente.
+    """
+    patient_ids = [record['id'] for record in run_query(db, f"MATCH (p:Patient) RETURN p.id AS id LIMIT {INGEST_PATIENTS}")]
+    doctor_ids = [record['id'] for record in run_query(db, "MATCH (d:Doctor) RETURN d.id AS id")]
+    procedure_ids = [record['id'] for record in run_query(db, "MATCH (proc:Procedure) RETURN proc.id AS id")]
+    max_visit_id = run_query(db, "MATCH (v:Visit) RETURN max(v.id) AS id")[0]['id'] or 0
+    visit_ids = itertools.count(max_visit_id + 1)
+    date_span = (INGEST_END_DATE - INGEST_START_DATE).days + 1
+
+    statement = (ingest_query
+                 + (ingest_aggregates_clause if 'aggregates' in GRAPH_MODELS else '')
+                 + (ingest_time_tree_clause if 'time_tree' in GRAPH_MODELS else ''))
+
+    def ingest():
+        run_query(db, statement, {
+            'id': next(visit_ids),
+            'patient_id': random.choice(patient_ids),
+            'doctor_id': random.choice(doctor_ids),
+            'procedure_id': random.choice(procedure_ids),
+            'date': (INGEST_START_DATE + timedelta(days=random.randrange(date_span))).isoformat(),
+            'cost': round(random.uniform(50, 500), 2),
+            'duration': random.randint(15, 120),
+        })
+
+    return ingest
+
+# Nodi che esistono solo se Dataset[Neo4j] ha caricato il modello (TIME_TREE, AGGREGATES)
+model_marker_labels = {'time_tree': 'Year', 'aggregates': 'MonthlyStats'}
+
+def require_graph_models(db, models):
+    """
+    Verifica che il database contenga i nodi dei modelli richiesti: senza, le query dell'albero
+    temporale e degli aggregati restituirebbero risultati vuoti misurati come validi.
+    """
+    for model in models:
+        label = model_marker_labels.get(model)
+        if label and not run_query(db, f"MATCH (n:{label}) RETURN n LIMIT 1"):
+            raise RuntimeError(f"Database '{db._database_name}' has no {label} nodes: model '{model}' is not loaded "
+                               f"(rerun Dataset[Neo4j].py with it enabled or remove it from GRAPH_MODELS).")
+
 def remove_outliers(data):
     if len(data) < 4:
         return data
@@ -76,32 +354,7 @@ def remove_outliers(data):
 def process_datasets():
     all_response_times = []
     first_execution_times = []
-
-    queries = {
-        'Query 1': """
-        MATCH (d:Doctor)-[:VISIT_TO]-(v:Visit)
-        WHERE v.date >= '2021-01-01' AND rand() < 1
-        WITH d, d.specialization AS specialization, COUNT(v) AS total_visits
-        RETURN d.id AS doctor_id, specialization, total_visits
-        """,
-        'Query 2': """ 
-        MATCH (v:Visit)-[:INCLUDES_PROCEDURE]-(proc:Procedure)
-        WHERE v.date >= '2021-01-01' AND v.date <= '2023-12-31' AND rand() < 1
-        WITH proc, proc.description AS description, COUNT(v) AS total_procedures
-        RETURN proc.id AS procedure_id, description, total_procedures
-        """,
-        'Query 3': """
-        MATCH (d:Doctor)-[:VISIT_TO]-(v:Visit)-[:VISIT_BY]-(p:Patient)
-        WHERE v.date >= '2021-01-01' AND v.date <= '2023-12-31' AND rand() < 1
-        WITH d, COUNT(DISTINCT p) AS total_patients
-        RETURN d.id AS doctor_id, total_patients
-        """,
-        'Query 4': """
-        MATCH (p:Patient)
-        WHERE p.birthdate >= '1940-06-21' AND rand() < 1
-        RETURN p
-        """
-    }
+    recorder = ResultStore.RunRecorder('Neo4j')
 
     # Ottieni la directory in cui si trova il file Python
     current_directory = os.path.dirname(os.path.abspath(__file__))
@@ -111,28 +364,54 @@ def process_datasets():
     os.makedirs(output_directory, exist_ok=True)
 
     for percent, db_name in database_mappings.items():
-        db = Neo4jConnection(uri, user, password, db_name)
+        db = Neo4jConnection(uri, user, password, db_name, instrument=INSTRUMENT)
+        require_graph_models(db, GRAPH_MODELS)
         
         # Svuota la cache una sola volta prima di cominciare con le query
         db.clear_cache()
 
-        for query_name, query in queries.items():
+        # I modelli del grafo vengono misurati uno dopo l'altro sullo stesso database
+        for model, query_name, query in (
+            (model, query_name, query)
+            for model in GRAPH_MODELS
+            for query_name, query in queries_by_model[model].items()
+        ):
+            # Il piano viene controllato prima delle misure: indica se i vincoli e gli indici
+            # creati da Dataset[Neo4j] vengono usati dalla query
+            plan_indexes = index_operators(db, query)
+            logging.info(f"Dataset: {percent} - {query_name} ({model}): "
+                         f"{'index-backed plan (' + ', '.join(plan_indexes) + ')' if plan_indexes else 'no index in plan'}")
             response_times = []
+            profiles = []  # Profili PROFILE delle esecuzioni, se in modalità strumentata
 
-            # Warm-up più lungo: esegui la query 10 volte
-            measure_query_time(db, query, warmup=10)
-
-            for i in range(101):
+            def execute():
                 elapsed_time = measure_query_time(db, query, warmup=0)
                 response_times.append(elapsed_time)
+                profiles.append(db.last_profile)
+                logging.info(f"Dataset: {percent} - {query_name} ({model}) execution {len(response_times)}: {elapsed_time:.2f} ms")
+                return elapsed_time
 
-                if i == 0:
-                    first_execution_time = elapsed_time
+            if ADAPTIVE_REPETITIONS:
+                _, warmup, stop_reason = AdaptiveRunner.run_adaptive(execute)
+                logging.info(f"Dataset: {percent} - {query_name} ({model}): {len(response_times)} executions, "
+                             f"{warmup} warm-up, stopped by {stop_reason}")
+            else:
+                # Warm-up più lungo: esegui la query 10 volte
+                measure_query_time(db, query, warmup=10)
+                warmup = 1
+                for i in range(101):
+                    execute()
+                    time.sleep(0.01)
 
-                logging.info(f"Dataset: {percent} - {query_name} execution {i+1}: {elapsed_time:.2f} ms")
-                time.sleep(0.01)
+            first_execution_time = response_times[0]
+            for i, elapsed_time in enumerate(response_times):
+                recorder.add(percent, query_name, i, elapsed_time, schema=model, steady=i >= warmup,
+                             index_backed=bool(plan_indexes))
+                if profiles[i] is not None:
+                    recorder.add_profile(percent, query_name, i, profiles[i], schema=model)
+            recorder.record_warmup(percent, query_name, warmup, schema=model)
 
-            filtered_response_times = remove_outliers(response_times[1:])
+            filtered_response_times = remove_outliers(response_times[warmup:])
 
             if filtered_response_times:
                 average_time_exact = np.mean(filtered_response_times)
@@ -143,36 +422,146 @@ def process_datasets():
             else:
                 average_time_rounded = average_time_exact = confidence_interval = None
 
+            # Percentili HDR su tutte le esecuzioni, senza togliere gli outlier: le code sono ciò che interessa
+            percentiles = ResultStore.hdr_percentiles(response_times[warmup:], [50, 99, 99.9])
+
             all_response_times.append({
                 'Dataset': percent,
+                'Schema': model,
                 'Query': query_name,
                 'Average of 100 Executions (ms)': f"{average_time_rounded:.2f}" if average_time_rounded is not None else 'N/A',
                 'Average Time (ms)': f"{average_time_exact:.6f}" if average_time_exact is not None else 'N/A',
-                'Confidence Interval (Min, Max)': f"({confidence_interval[0]:.2f}, {confidence_interval[1]:.2f})" if confidence_interval is not None else 'N/A'
+                'Confidence Interval (Min, Max)': f"({confidence_interval[0]:.2f}, {confidence_interval[1]:.2f})" if confidence_interval is not None else 'N/A',
+                'p50 (ms)': f"{percentiles[50]:.2f}",
+                'p99 (ms)': f"{percentiles[99]:.2f}",
+                'p99.9 (ms)': f"{percentiles[99.9]:.2f}",
+                'Executions': len(response_times) - warmup,
+                'Warm-up Executions': warmup,
+                'Index Operators': ', '.join(plan_indexes) or 'None',
             })
 
             first_execution_times.append({
                 'Dataset': percent,
+                'Schema': model,
                 'Query': query_name,
                 'First Execution Time (ms)': f"{first_execution_time:.2f}"
             })
 
         db.close()
 
+    run_id = recorder.save()
+    logging.info(f"Campioni grezzi salvati nell'esecuzione '{run_id}'")
+
     # Salvataggio dei dati nei file CSV
     response_times_file = os.path.join(output_directory, 'neo4j_100_avg_execution.csv')
     with open(response_times_file, 'w', newline='') as csvfile:
-        fieldnames = ['Dataset', 'Query', 'Average of 100 Executions (ms)', 'Average Time (ms)', 'Confidence Interval (Min, Max)']
+        fieldnames = ['Dataset', 'Schema', 'Query', 'Average of 100 Executions (ms)', 'Average Time (ms)', 'Confidence Interval (Min, Max)',
+                      'p50 (ms)', 'p99 (ms)', 'p99.9 (ms)', 'Executions', 'Warm-up Executions', 'Index Operators']
         writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
         writer.writeheader()
         writer.writerows(all_response_times)
 
     first_execution_times_file = os.path.join(output_directory, 'neo4j_first_execution.csv')
     with open(first_execution_times_file, 'w', newline='') as csvfile:
-        fieldnames = ['Dataset', 'Query', 'First Execution Time (ms)']
+        fieldnames = ['Dataset', 'Schema', 'Query', 'First Execution Time (ms)']
         writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
         writer.writeheader()
         writer.writerows(first_execution_times)
 
+def sweep_range_widths():
+    """
+    Esegue la query di intervallo di ogni modello per ciascuna ampiezza di RANGE_WIDTHS e scrive
+    in neo4j_range_width_sweep.csv la latenza mediana e il p99, il numero di visite nell'intervallo
+    e il totale delle visite del database: sul modello 'property' la latenza segue il totale,
+    sull'albero temporale dovrebbe seguire le visite nell'intervallo.
+    """
+    sweep_results = []
+    for percent, db_name in database_mappings.items():
+        db = Neo4jConnection(uri, user, password, db_name)
+        require_graph_models(db, GRAPH_MODELS)
+        total_visits = run_query(db, "MATCH (v:Visit) RETURN COUNT(v) AS visits")[0]['visits']
+        for width in RANGE_WIDTHS:
+            parameters = {
+                'start': (RANGE_END_DATE - timedelta(days=width - 1)).isoformat(),
+                'end': RANGE_END_DATE.isoformat(),
+            }
+            for model in (model for model in GRAPH_MODELS if model in range_queries):
+                run_query(db, range_queries[model], parameters)  # Esecuzione di riscaldamento
+                latencies = []
+                for _ in range(SWEEP_REPETITIONS):
+                    start_time = time.perf_counter()
+                    visits = run_query(db, range_queries[model], parameters)[0]['visits']
+                    latencies.append((time.perf_counter() - start_time) * 1000)
+                sweep_results.append({
+                    'Dataset': percent,
+                    'Schema': model,
+                    'Range Width (days)': width,
+                    'Visits in Range': visits,
+                    'Total Visits': total_visits,
+                    'Median (ms)': f"{np.median(latencies):.2f}",
+                    'p99 (ms)': f"{np.percentile(latencies, 99):.2f}",
+                })
+                logging.info(f"Dataset: {percent} - {width} days ({model}): {visits} of {total_visits} visits, "
+                             f"median {np.median(latencies):.2f} ms")
+        db.close()
+
+    output_directory = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'ResponseTimes')
+    os.makedirs(output_directory, exist_ok=True)
+    sweep_file = os.path.join(output_directory, 'neo4j_range_width_sweep.csv')
+    with open(sweep_file, 'w', newline='') as csvfile:
+        fieldnames = ['Dataset', 'Schema', 'Range Width (days)', 'Visits in Range', 'Total Visits', 'Median (ms)', 'p99 (ms)']
+        writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
+        writer.writeheader()
+        writer.writerows(sweep_results)
+
+def run_load_test():
+    load_results = []
+    recorder = ResultStore.RunRecorder('Neo4j-load')  # Latenze grezze di ogni livello di carico
+    for percent, db_name in database_mappings.items():
+        db = Neo4jConnection(uri, user, password, db_name)
+        require_graph_models(db, GRAPH_MODELS)
+        for model in GRAPH_MODELS:
+            for query_name, query in queries_by_model[model].items():
+                labels = {'Backend': 'Neo4j', 'Dataset': percent, 'Schema': model, 'Query': query_name}
+                rows = LoadGenerator.sweep_clients(partial(run_query, db, query), labels, recorder)
+                clients, qps = LoadGenerator.saturation_point(rows)
+                logging.info(f"Dataset: {percent} - {query_name} ({model}) peak throughput {qps} QPS at {clients} clients")
+                load_results.extend(rows)
+        db.close()
+
+    run_id = recorder.save()
+    logging.info(f"Campioni grezzi salvati nell'esecuzione '{run_id}'")
+
+    output_directory = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'ResponseTimes')
+    os.makedirs(output_directory, exist_ok=True)
+    LoadGenerator.write_load_results(os.path.join(output_directory, 'neo4j_load_test.csv'), load_results)
+
+def run_mixed_workload():
+    mixed_results = []
+    recorder = ResultStore.RunRecorder('Neo4j-mixed')  # Latenze grezze di letture e scritture
+    for percent, db_name in database_mappings.items():
+        db = Neo4jConnection(uri, user, password, db_name)
+        require_graph_models(db, GRAPH_MODELS)
+        ingest = build_visit_ingest(db)
+        for model in GRAPH_MODELS:
+            for query_name, query in queries_by_model[model].items():
+                labels = {'Backend': 'Neo4j', 'Dataset': percent, 'Schema': model, 'Query': query_name}
+                mixed_results.extend(LoadGenerator.sweep_write_rates(partial(run_query, db, query), ingest, labels, recorder))
+        db.close()
+
+    run_id = recorder.save()
+    logging.info(f"Campioni grezzi salvati nell'esecuzione '{run_id}'")
+
+    output_directory = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'ResponseTimes')
+    os.makedirs(output_directory, exist_ok=True)
+    LoadGenerator.write_load_results(os.path.join(output_directory, 'neo4j_mixed_workload.csv'), mixed_results)
+
 if __name__ == "__main__":
-    process_datasets()
+    if LOAD_TEST:
+        run_load_test()
+    elif MIXED_WORKLOAD:
+        run_mixed_workload()
+    else:
+        process_datasets()
+        if RANGE_WIDTH_SWEEP:
+            sweep_range_widths()
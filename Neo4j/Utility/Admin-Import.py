@@ -0,0 +1,77 @@
+import os
+import subprocess
+import time
+from neo4j import GraphDatabase
+
+# Dati di connessione
+uri = "bolt://localhost:7687"  # Modifica questo se il tuo Neo4j è in un'altra posizione
+user = "neo4j"  # Modifica questo con il tuo nome utente
+password = "12345678"  # Modifica questo con la tua password
+
+# Eseguibile di neo4j-admin del server locale (es. /var/lib/neo4j/bin/neo4j-admin)
+NEO4J_ADMIN = "neo4j-admin"
+
+# File scritti da Dataset[Neo4j].py con LOAD_MODE = 'admin_import', una cartella per database
+IMPORT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'Import')
+
+# Elenco dei database da ricostruire
+databases = ["dataset100", "dataset75", "dataset50", "dataset25"]
+
+# File di nodi (etichetta, file) e di relazioni (il tipo è nella colonna :TYPE); quelli
+# dell'albero temporale e degli aggregati ci sono solo se scritti con TIME_TREE e AGGREGATES
+node_files = ['Patient', 'Doctor', 'Procedure', 'Visit', 'Year', 'Month', 'Day', 'MonthlyStats']
+relationship_files = ['VISIT_BY', 'VISIT_TO', 'INCLUDES_PROCEDURE', 'HAS_MONTH', 'HAS_DAY', 'ON_DAY',
+                      'TREATED', 'Doctor_HAS_MONTHLY_STATS', 'Procedure_HAS_MONTHLY_STATS']
+
+def import_command(database_name):
+    import_dir = os.path.abspath(os.path.join(IMPORT_DIR, database_name))
+    return [
+        NEO4J_ADMIN, 'database', 'import', 'full',
+        '--id-type=INTEGER',
+        '--multiline-fields=true',  # Gli indirizzi generati da Faker vanno a capo
+        '--overwrite-destination=true',
+        *(f'--nodes={label}={os.path.join(import_dir, label + ".csv")}'
+          for label in node_files if os.path.exists(os.path.join(import_dir, label + ".csv"))),
+        *(f'--relationships={os.path.join(import_dir, name + ".csv")}'
+          for name in relationship_files if os.path.exists(os.path.join(import_dir, name + ".csv"))),
+        database_name,
+    ]
+
+# Funzione per sostituire un database con quello costruito dall'importazione offline:
+# il database viene fermato, importato con neo4j-admin e riavviato, poi vengono creati
+# vincoli e indici (l'importazione non li crea) da schema.cypher
+def import_database(driver, database_name):
+    with driver.session(database="system") as session:
+        existing = [record["name"] for record in session.run("SHOW DATABASES YIELD name")]
+        if database_name in existing:
+            session.run(f"STOP DATABASE {database_name} WAIT").consume()
+
+    print(f"Importing '{database_name}'...")
+    start_time = time.perf_counter()
+    subprocess.run(import_command(database_name), check=True)
+    print(f"Import of '{database_name}' completed in {time.perf_counter() - start_time:.1f} s.")
+
+    with driver.session(database="system") as session:
+        if database_name in existing:
+            session.run(f"START DATABASE {database_name} WAIT").consume()
+        else:
+            session.run(f"CREATE DATABASE {database_name} IF NOT EXISTS WAIT").consume()
+
+    with open(os.path.join(IMPORT_DIR, database_name, 'schema.cypher')) as schema_file:
+        statements = [statement.strip() for statement in schema_file.read().split(';') if statement.strip()]
+    with driver.session(database=database_name) as session:
+        for statement in statements:
+            session.run(statement).consume()
+        session.run("CALL db.awaitIndexes(300)").consume()
+    print(f"Constraints and indexes online in '{database_name}'.")
+
+def main():
+    driver = GraphDatabase.driver(uri, auth=(user, password))
+    try:
+        for db in databases:
+            import_database(driver, db)
+    finally:
+        driver.close()
+
+if __name__ == "__main__":
+    main()